@@ -28,21 +28,57 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import os
+import sys
 import json
 import ast
 import argparse
 import hashlib
-from prettytable import PrettyTable
-from tqdm import tqdm as tqdm
-from typing import List, Tuple
+import mmap
+from typing import List, Optional, Tuple
 import shutil
-import ollama
 import warnings
-from copy import deepcopy
 from contextlib import contextmanager
+from enum import Enum
+from collections import deque
+from functools import cached_property, lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 VERSION = "2.0.0"
 GITPAGE = "https://github.com/sealad886/ollama_util"
+# the symlink Ollama reads its models from, switched by _toggle_cache
+OLLAMA_MODELS_LINK = os.path.join(os.path.expanduser("~"), ".ollama", "models")
+# read size for the userspace copy and hashing loops
+HASH_BUFFER_SIZE = 1 << 20
+# hash threads shared by copy_files, and how many copied files may await
+# verification before the next copy blocks (keeps HDDs from thrashing)
+HASH_WORKERS = 4
+MAX_PENDING_VERIFICATIONS = 2
+# threads used to read manifest files in build_model_list
+MANIFEST_WORKERS = 16
+
+# accepted answers for get_user_confirmation
+_YES_RESPONSES = frozenset({"yes", "y"})
+_NO_RESPONSES = frozenset({"no", "n"})
+# re-hash copies made by the kernel/filesystem too; set by --verify
+VERIFY_ALL_COPIES = False
+
+# caches whose directory exists, see available_caches
+_AVAILABLE_CACHES = None
+# (cache type, path) currently symlinked at ~/.ollama/models, see get_curnow_cache
+_CURNOW_CACHE = None
+# copyfile(3) flag from <copyfile.h>: clone or fail, never a silent data copy;
+# implies EXCL, ACL, STAT, XATTR, DATA and NOFOLLOW_SRC
+COPYFILE_CLONE_FORCE = 1 << 25
 
 
 def display_welcome() -> None:
@@ -78,7 +114,7 @@ class Model:
     def manifest(self):
         return f"{self.library}/{self.model}/{self.version}"
 
-    @property
+    @cached_property
     def size(self):
         size = 0
         if 'size' in self.config:
@@ -132,26 +168,57 @@ class Model:
             return False
         return (
             self.name == other.name and
-            self.get_digests() == other.get_digests()
+            self._digest_set == other._digest_set
         )
 
+    def __hash__(self):
+        # name and digests are fixed once built; caches is not part of identity
+        return hash((self.name, self._digest_set))
+
     def copy(self):
-        return deepcopy(self)
+        # config and layers are never mutated, so only the cache flags need
+        # their own list; copy.deepcopy is far slower for the same result
+        clone = Model.__new__(Model)
+        clone.__dict__.update(self.__dict__)
+        clone.caches = list(self.caches)
+        return clone
 
     def get_digests(self):
         '''
         Return a list of the digest/blod file names to be moved.
         If the manifest file describes the filenames using a ':'
         character, this returns the file names using a '-' instead.
+        The list is built once per model; callers must not modify it.
         Returns:
             List of digest filenames, replaces ':' with '-'
         '''
+        return self._digests
+
+    @cached_property
+    def _digests(self):
         digests = []
         digests.append(self.config['digest'].replace(':', '-'))
         for layer in self.layers:
             digests.append(layer['digest'].replace(':', '-'))
         return digests
 
+    def get_digest_sizes(self):
+        '''
+        Return the size in bytes of each digest/blob file, as recorded in the
+        manifest. Digests the manifest gives no size for are left out.
+        Returns:
+            Dict of digest filename (as in get_digests) to size
+        '''
+        sizes = {}
+        for entry in [self.config, *self.layers]:
+            if 'size' in entry:
+                sizes[entry['digest'].replace(':', '-')] = entry['size']
+        return sizes
+
+    @cached_property
+    def _digest_set(self):
+        return frozenset(self._digests)
+
     def get_size(self):
         def convert_bytes(size):
             for x in ['bytes', 'KB', 'MB', 'GB', 'TB']:
@@ -176,7 +243,7 @@ def auto_cache_state():
 
 
 def cache_type_to_cache(cache_type: str) -> Tuple[str, str]:
-    return next((cache, path) for cache, path in valid_caches if cache == cache_type)
+    return cache_by_name[cache_type]
 
 
 def get_user_confirmation(prompt: str):
@@ -189,22 +256,34 @@ def get_user_confirmation(prompt: str):
     Returns:
         bool: True if the user confirms (yes), False otherwise (no).
     '''
-    valid_responses = {"yes": True, "y": True, "no": False, "n": False}
     prompt = prompt.strip()
     while True:
         # Ask the user and get the response
-        user_response = input(f"{prompt} (yes/no): ").lower()
+        user_response = input(f"{prompt} (yes/no): ").strip().lower()
 
         # Validate and process the response
-        if user_response in valid_responses:
-            return valid_responses[user_response]
-        else:
-            print("Invalid response. Please answer 'yes' or 'no'.")
+        if user_response in _YES_RESPONSES:
+            return True
+        if user_response in _NO_RESPONSES:
+            return False
+        print("Invalid response. Please answer 'yes' or 'no'.")
 
 
 def get_curnow_cache():
-    home = os.path.expanduser("~")
-    current_path = os.path.realpath(os.path.join(home, '.ollama', 'models'))
+    '''
+    Return the (cache type, path) that $HOME/.ollama/models points at.
+    The result is remembered until _toggle_cache changes the symlink.
+    '''
+    global _CURNOW_CACHE
+    if _CURNOW_CACHE is not None:
+        return _CURNOW_CACHE
+    try:
+        # a single readlink, rather than realpath's lstat of every component
+        current_path = os.readlink(OLLAMA_MODELS_LINK)
+    except OSError:
+        current_path = os.path.realpath(OLLAMA_MODELS_LINK)
+    if current_path not in (ollama_int_dir, ollama_ext_dir):
+        current_path = os.path.realpath(OLLAMA_MODELS_LINK)
     curnow = None
     if current_path == ollama_int_dir:
         curnow = ("internal", current_path)
@@ -213,14 +292,15 @@ def get_curnow_cache():
     else:
         AssertionError(f"Error: somehow managed to get to {current_path}")
 
+    _CURNOW_CACHE = curnow
     return curnow
 
 
 def toggle_cache(skip_conf: bool = False) -> str:
     curnow, curnow_path = get_curnow_cache()
     toggle_to = {
-        'internal': next((cache, path) for cache, path in valid_caches if cache == 'external'),
-        'external': next((cache, path) for cache, path in valid_caches if cache == 'internal')
+        'internal': cache_by_name['external'],
+        'external': cache_by_name['internal']
     }
 
     print(f"Current Ollama cache set to: {curnow.upper()}.")
@@ -238,24 +318,40 @@ def _toggle_cache(toggle_target: Tuple[str, str], *, silent=False) -> str:
     Use decorator @auto_cache_state() where possible
     Change the cache symlinked at $HOME/.ollama.
     '''
+    # checked live: pointing Ollama at an unplugged drive is worse than a stat
     if not is_cache_available(toggle_target):
+        _invalidate_caches()
         warnings.warn(f"Target cache toggle {toggle_target[0].upper()} is not available.")
         return
-    if toggle_target[0] == "internal":
-        os.system(f"ln -s -F -f -h {ollama_int_dir} ${{HOME}}/.ollama/models")
-        if not silent:
-            print("Changed .ollama symlink to look to INTERNAL drive.")
-        return "external"
-    elif toggle_target[0] == "external":
-        os.system(f"ln -s -F -f -h {ollama_ext_dir} ${{HOME}}/.ollama/models")
-        if not silent:
-            print("Changed .ollama symlink to look to EXTERNAL drive.")
-        return "internal"
-    else:
+    if toggle_target[0] not in ("internal", "external"):
         warnings.warn(f'Cache target not toggled. Requested target \'{toggle_target[0]}\' not defined.')
+        return
+    global _CURNOW_CACHE
+    target_dir = ollama_int_dir if toggle_target[0] == "internal" else ollama_ext_dir
+    # build the new link beside the old one and rename it over the top, so
+    # ~/.ollama/models is never missing and no shell is spawned
+    tmp_link = OLLAMA_MODELS_LINK + ".tmp"
+    try:
+        if os.path.lexists(tmp_link):
+            os.unlink(tmp_link)
+        os.symlink(target_dir, tmp_link)
+        os.replace(tmp_link, OLLAMA_MODELS_LINK)
+    except OSError as e:
+        # e.g. ~/.ollama/models is a real directory rather than a symlink
+        if os.path.lexists(tmp_link):
+            os.unlink(tmp_link)
+        _CURNOW_CACHE = None
+        warnings.warn(f"Unable to point {OLLAMA_MODELS_LINK} at {target_dir}: {e}")
+        return
+    _CURNOW_CACHE = (toggle_target[0], target_dir)
+    if not silent:
+        print(f"Changed .ollama symlink to look to {toggle_target[0].upper()} drive.")
+    return "external" if toggle_target[0] == "internal" else "internal"
 
 
 def models_in_cache_list() -> List[Tuple[str, str, str]]:
+    import ollama
+
     model_list = ollama.list()['models']
     model_names: List[str] = []
     for mod in model_list:
@@ -280,14 +376,23 @@ def build_model_list(models: List[Model], *, force_rebuild: bool = False) -> lis
         return
     caches = available_caches()
     # print(f'Available caches: {[c[0] for c in caches]}')
+    # ollama.list() reports whichever cache the symlink points at, so listing
+    # stays serial on this thread; the manifest reads are then done in parallel
+    to_read = []
     for cache, cache_path in caches:
         _toggle_cache((cache, cache_path), silent=True)
-        skipped_models = 0
         manifest_path = os.path.join(cache_path, "manifests", "registry.ollama.ai")
         for model in models_in_cache_list():
+            to_read.append(((cache, cache_path), model, os.path.join(manifest_path, *model)))
+
+    skipped_models = 0
+    # the same model is normally listed by every cache; find it by hash
+    known_models = {m: m for m in models}
+    with ThreadPoolExecutor(max_workers=MANIFEST_WORKERS) as pool:
+        futures = [pool.submit(read_manifest, path) for _, _, path in to_read]
+        for (cache, model, _), future in zip(to_read, futures):
             try:
-                with open(os.path.join(manifest_path, *model), 'r') as man:
-                    manifest = json.load(man)
+                manifest = future.result()
             except OSError as e:
                 warnings.warn(f"Attempting to read manifest {model}, cached files do not exist.", source=e)
                 continue
@@ -296,28 +401,53 @@ def build_model_list(models: List[Model], *, force_rebuild: bool = False) -> lis
                 manifest['layers'],
                 *model
             )
-            new_model.add_cache_flag((cache, cache_path))
-            pass
-            existing_model: Model = next((m for m in models if m == new_model), None)
+            new_model.add_cache_flag(cache)
+            existing_model: Model = known_models.get(new_model)
             if existing_model:
-                existing_model.add_cache_flag((cache, cache_path))
+                existing_model.add_cache_flag(cache)
                 skipped_models += 1
             else:
                 models.append(new_model)
+                known_models[new_model] = new_model
 
     return models
 
 
+def read_manifest(manifest_file: str) -> dict:
+    '''
+    Read and parse a single manifest file. OSError is left to the caller.
+    '''
+    with open(manifest_file, 'rb') as man:
+        return load_manifest(man.read())
+
+
+def load_manifest(raw: bytes) -> dict:
+    '''
+    Parse a manifest file's contents, using orjson when it is installed.
+    '''
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
 def is_cache_available(cache_tuple: str) -> bool:
     return os.path.isdir(cache_tuple[1])
 
 
 def available_caches() -> List[Tuple[str, str]]:
-    available_caches = []
-    for cache in valid_caches:
-        if is_cache_available(cache):
-            available_caches.append(cache)
-    return available_caches
+    '''
+    Return the configured caches whose directories exist.
+    Checked once and remembered until _invalidate_caches is called.
+    '''
+    global _AVAILABLE_CACHES
+    if _AVAILABLE_CACHES is None:
+        _AVAILABLE_CACHES = [cache for cache in valid_caches if is_cache_available(cache)]
+    return list(_AVAILABLE_CACHES)
+
+
+def _invalidate_caches() -> None:
+    global _AVAILABLE_CACHES
+    _AVAILABLE_CACHES = None
 
 
 def display_models(models: List[Model]) -> None:
@@ -327,6 +457,8 @@ def display_models(models: List[Model]) -> None:
     Parameters:
     models (List[Model]): The list of Model objects to display.
     """
+    from prettytable import PrettyTable
+
     # Create a PrettyTable object
     table = PrettyTable()
 
@@ -379,10 +511,17 @@ def copy_models_cache_to_cache(models: List[Model]):
     files_to_copy = build_files_to_copy(selected_models, current_cache)
     # Check if files already exist in the destination cache
     target_cache_path = target_cache[1]
-    existing_files = [
-        f for f in files_to_copy if os.path.exists(f.replace(current_cache[1], target_cache_path))
-    ]
-
+    source_blob_dir = os.path.join(current_cache[1], 'blobs')
+    target_blobs = _scan_blobs(target_cache_path)
+    existing_files = set()
+    for f in files_to_copy:
+        if os.path.dirname(f) == source_blob_dir:
+            if os.path.basename(f) in target_blobs:
+                existing_files.add(f)
+        elif os.path.isfile(f.replace(current_cache[1], target_cache_path)):
+            existing_files.add(f)
+
+    overwrite = False
     if existing_files:
         print(f"\nOf {len(files_to_copy)} total files, {len(existing_files)} files already exist in the destination cache.")
 
@@ -397,7 +536,15 @@ def copy_models_cache_to_cache(models: List[Model]):
 
     # Step 4: Confirm transfer details
     print(f"Copying from {current_cache[0]} to {target_cache[0]}.")
-    total_size = sum(os.path.getsize(f) for f in files_to_copy)
+    # blob sizes are recorded in the manifests, so only files without one need a stat
+    blob_sizes = {}
+    for model in selected_models:
+        blob_sizes.update(model.get_digest_sizes())
+    file_sizes = {}
+    for f in files_to_copy:
+        size = blob_sizes.get(os.path.basename(f)) if os.path.dirname(f) == source_blob_dir else None
+        file_sizes[f] = size if size is not None else os.path.getsize(f)
+    total_size = sum(file_sizes.values())
     print(f"Total files to copy: {len(files_to_copy)} "
           f"{f'(excluding {len(existing_files)} existing files)' if not overwrite else ''}")
     print(f"Total size: {convert_bytes(total_size)}")
@@ -407,7 +554,7 @@ def copy_models_cache_to_cache(models: List[Model]):
         return
 
     # Step 5: Copy files and verify integrity
-    copy_files(files_to_copy, current_cache, target_cache)
+    copy_files(files_to_copy, current_cache, target_cache, file_sizes)
 
     # Step 6: Handle any errors and cleanup if necessary
     print("Transfer completed successfully.")
@@ -441,6 +588,24 @@ def parse_indices(indices: str, models: List) -> List:
     return selected
 
 
+def _scan_blobs(cache_path: str) -> set:
+    """
+    List the blob file names in a cache with one directory read,
+    instead of a stat per blob.
+
+    Args:
+        cache_path (str): Path to the cache (the models/ directory).
+
+    Returns:
+        set: Names of the files in cache_path/blobs; empty if it doesn't exist.
+    """
+    try:
+        with os.scandir(os.path.join(cache_path, 'blobs')) as it:
+            return {entry.name for entry in it}
+    except FileNotFoundError:
+        return set()
+
+
 def build_files_to_copy(models: List[Model], current_cache: Tuple[str, str]) -> List[str]:
     """
     Build the list of files to copy for the selected models.
@@ -452,19 +617,30 @@ def build_files_to_copy(models: List[Model], current_cache: Tuple[str, str]) ->
     Returns:
         List[str]: The list of file paths to copy.
     """
-    files_to_copy = set()
+    blob_dir = os.path.join(current_cache[1], 'blobs')
+    # models often share layers, so look each digest up once
+    all_digests = set().union(*(model.get_digests() for model in models))
+    files_to_copy = {os.path.join(blob_dir, digest) for digest in all_digests & _scan_blobs(current_cache[1])}
     for model in models:
-        for digest in model.get_digests():
-            digest_path = os.path.join(current_cache[1], 'blobs',  digest)
-            if os.path.exists(digest_path):
-                files_to_copy.add(digest_path)
         manifest_path = os.path.join(current_cache[1], 'manifests', 'registry.ollama.ai', model.manifest)
         if os.path.exists(manifest_path):
             files_to_copy.add(manifest_path)
     return list(files_to_copy)
 
 
-def copy_files(files_to_copy: List[str], current_cache: Tuple[str, str], target_cache: Tuple[str, str]) -> None:
+class CopyMethod(Enum):
+    '''
+    How _fast_copy moved a file's data.
+    CLONED and KERNEL_COPY are done by the filesystem/kernel, so the copy is
+    only re-hashed when verification of every copy is requested.
+    '''
+    CLONED = "cloned"
+    KERNEL_COPY = "kernel copy"
+    USERSPACE_COPY = "userspace copy"
+
+
+def copy_files(files_to_copy: List[str], current_cache: Tuple[str, str], target_cache: Tuple[str, str],
+               file_sizes: Optional[dict] = None) -> None:
     """
     Copy the files and verify integrity.
 
@@ -472,34 +648,148 @@ def copy_files(files_to_copy: List[str], current_cache: Tuple[str, str], target_
         files_to_copy (List[str]): The files to copy.
         current_cache (Tuple[str, str]): The current cache.
         target_cache (Tuple[str, str]): The target cache.
+        file_sizes (dict, optional): Size in bytes of each file, for the progress
+                                     bar. Looked up here if not given.
     """
-    target_dir = target_cache[1]
-    for file in tqdm(files_to_copy, desc="Copying files", unit="file", dynamic_ncols=True, miniters=1):
-        target_file = file.replace(current_cache[1], target_dir)
-        target_dir_path = os.path.realpath(os.path.dirname(target_file))
-        os.makedirs(target_dir_path, exist_ok=True)
-        shutil.copy2(file, target_file)
-        if not file_integrity_check(file, target_file):
-            warnings.warn(f"Integrity check failed for file: {file}")
+    from tqdm import tqdm
 
+    def check_oldest():
+        file, source_hash, target_hash = pending.popleft()
+        if not isinstance(source_hash, str):
+            source_hash = source_hash.result()
+        if source_hash != target_hash.result():
+            warnings.warn(f"Integrity check failed for file: {file}")
 
-def file_integrity_check(source_file: str, target_file: str) -> bool:
+    target_dir = target_cache[1]
+    # file N is verified in the background while file N+1 is being copied
+    pending = deque()
+    unverified = 0
+    if file_sizes is None:
+        file_sizes = {f: os.path.getsize(f) for f in files_to_copy}
+    # progress is in bytes: a handful of multi-GB blobs dominate any transfer
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool, \
+            tqdm(total=sum(file_sizes.values()), desc="Copying files", unit="B", unit_scale=True,
+                 dynamic_ncols=True, mininterval=0.2) as pbar:
+        for file in files_to_copy:
+            target_file = file.replace(current_cache[1], target_dir)
+            target_dir_path = os.path.realpath(os.path.dirname(target_file))
+            os.makedirs(target_dir_path, exist_ok=True)
+            method, source_hash = _fast_copy(file, target_file)
+            pbar.update(file_sizes[file])
+            if method != CopyMethod.USERSPACE_COPY and not VERIFY_ALL_COPIES:
+                unverified += 1
+                continue
+            # a userspace copy hashed the source on the way through, so only
+            # the target needs to be read back
+            if source_hash is None:
+                source_hash = pool.submit(file_hash, file)
+            pending.append((file, source_hash, pool.submit(file_hash, target_file)))
+            while len(pending) > MAX_PENDING_VERIFICATIONS:
+                check_oldest()
+        while pending:
+            check_oldest()
+    if unverified:
+        print(f"Skipped verification for {unverified} cloned or kernel-copied files (use --verify to check them).")
+
+
+def _fast_copy(source_file: str, target_file: str) -> Tuple[CopyMethod, Optional[str]]:
     """
-    Check if the copied file has the same hash as the source file.
+    Copy a file without bouncing its data through Python buffers.
+    On macOS this clones with copyfile(3) where the volume allows it. On Linux it
+    loops os.copy_file_range, which reflinks on Btrfs/XFS and otherwise
+    copies in the kernel. Elsewhere, or if those fail, the data is streamed
+    through Python once, hashing the source as it is written.
+    File metadata is copied afterwards, as shutil.copy2 would.
 
     Args:
         source_file (str): The source file.
         target_file (str): The target file.
 
     Returns:
-        bool: True if integrity is intact, False otherwise.
+        Tuple[CopyMethod, Optional[str]]: How the data was copied, and the source
+            hash (as file_hash would return it) for userspace copies.
+    """
+    if os.path.realpath(source_file) == os.path.realpath(target_file):
+        raise shutil.SameFileError(f"{source_file!r} and {target_file!r} are the same file")
+    if sys.platform == "darwin" and _darwin_clonefile(source_file, target_file):
+        shutil.copystat(source_file, target_file)
+        return CopyMethod.CLONED, None
+    # unlink rather than truncate: target may be a hard link to source
+    if os.path.lexists(target_file):
+        os.remove(target_file)
+    method, source_hash = CopyMethod.KERNEL_COPY, None
+    with open(source_file, "rb") as src, open(target_file, "wb") as dst:
+        if not _copy_file_range(src, dst):
+            method = CopyMethod.USERSPACE_COPY
+            # single read/write/hash pass
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(src.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            hasher = _new_hasher()
+            for chunk in _read_chunks(src):
+                dst.write(chunk)
+                hasher.update(chunk)
+            source_hash = hasher.hexdigest()
+        if hasattr(os, "posix_fadvise"):
+            # the blob won't be read again, so don't let it evict the page cache
+            os.posix_fadvise(src.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    shutil.copystat(source_file, target_file)
+    return method, source_hash
+
+
+def _copy_file_range(src, dst) -> bool:
     """
-    return file_hash(source_file) == file_hash(target_file)
+    Copy an open file's contents with os.copy_file_range (Linux).
+
+    Returns:
+        bool: True on success. False if unavailable, the kernel refused
+            (e.g. EXDEV on older kernels) or it stopped short of the file's
+            size (some FUSE and procfs-like filesystems); dst is then left empty.
+    """
+    if not hasattr(os, "copy_file_range"):
+        return False
+    try:
+        remaining = os.fstat(src.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            if copied == 0:
+                raise OSError(f"copy_file_range stopped with {remaining} bytes left")
+            remaining -= copied
+    except OSError:
+        src.seek(0)
+        dst.seek(0)
+        dst.truncate()
+        return False
+    return True
+
+
+def _darwin_clonefile(source_file: str, target_file: str) -> bool:
+    """
+    Clone a file with macOS copyfile(3) and COPYFILE_CLONE_FORCE.
+    Plain COPYFILE_CLONE quietly copies the bytes when the volume can't
+    clone (e.g. internal SSD to external drive); that copy would then be
+    reported as a clone and not verified.
+
+    Returns:
+        bool: True if the file was cloned, False if the caller should copy it.
+    """
+    import ctypes
+    import ctypes.util
+
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    # COPYFILE_CLONE_FORCE implies COPYFILE_EXCL, so clear the way first
+    if os.path.lexists(target_file):
+        os.remove(target_file)
+    result = libc.copyfile(os.fsencode(source_file), os.fsencode(target_file), None,
+                           ctypes.c_uint32(COPYFILE_CLONE_FORCE))
+    return result == 0
 
 
 def file_hash(file_path: str) -> str:
     """
     Calculate the hash of a file.
+    Uses BLAKE3 (memory-mapped, multithreaded) when the optional blake3
+    package is installed, otherwise SHA-256, which hashlib dispatches to
+    the CPU's SHA extensions where available.
 
     Args:
         file_path (str): The path to the file.
@@ -507,12 +797,44 @@ def file_hash(file_path: str) -> str:
     Returns:
         str: The hash of the file.
     """
-    hash_md5 = hashlib.md5()
-    buffer_size = 65536
+    if blake3 is not None:
+        hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+        hasher.update_mmap(file_path)
+        return hasher.hexdigest()
+    hasher = _new_hasher()
     with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(buffer_size), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+        if os.fstat(f.fileno()).st_size > HASH_BUFFER_SIZE:
+            # one update over the mapped file: no per-chunk reads or allocations
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mm, "madvise"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                hasher.update(mm)
+            return hasher.hexdigest()
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        for chunk in _read_chunks(f):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _read_chunks(f):
+    """
+    Yield an open binary file's contents as views into one reused buffer.
+    readinto and hashlib's update both release the GIL on buffers this
+    size, so copy/hash threads run in parallel, and no new bytes object is
+    allocated per chunk. Each view is only valid until the next is yielded.
+    """
+    buffer = bytearray(HASH_BUFFER_SIZE)
+    view = memoryview(buffer)
+    while size := f.readinto(buffer):
+        yield view[:size]
+
+
+def _new_hasher():
+    """
+    Return an empty hash object using the same algorithm as file_hash.
+    """
+    return blake3.blake3() if blake3 is not None else hashlib.sha256()
 
 
 def user_select_models(models):
@@ -539,6 +861,8 @@ def remove_model_from_cache(models: List[Model]) -> None:
     Parameters:
     models (List[Model]): The list of available Model objects.
     """
+    import ollama
+    from tqdm import tqdm
 
     # Display available models for removal
     display_models(models)
@@ -571,7 +895,7 @@ def remove_model_from_cache(models: List[Model]) -> None:
     # Remove the selected models
     for cache in selected_caches:
         _toggle_cache(cache)
-        for model in tqdm(selected_models, desc="Deleting models", unit="models", dynamic_ncols=True):
+        for model in tqdm(selected_models, desc="Deleting models", unit="models", dynamic_ncols=True, mininterval=0.5):
             ollama.delete(model.name)
 
         # I think ollama.list() will force the ollama server to do its cleanup activites?
@@ -590,6 +914,9 @@ def pull_models(models: List[Model]) -> None:
     Args:
         models (List[Model]): The list of available Model objects.
     """
+    import ollama
+    from tqdm import tqdm
+
     selected_models = user_select_models(models)
 
     if not selected_models:
@@ -607,7 +934,7 @@ def pull_models(models: List[Model]) -> None:
         print("Pull operation canceled.")
         return
 
-    for model in tqdm(selected_models, desc="Pulling models", unit="models", dynamic_ncols=True):
+    for model in tqdm(selected_models, desc="Pulling models", unit="models", dynamic_ncols=True, mininterval=0.5):
         ollama.pull(model.name)
 
     print(f"Pulled {len(selected_models)} models successfully.")
@@ -620,6 +947,9 @@ def push_models(models: List[Model]) -> None:
     Args:
         models (List[Model]): The list of available Model objects.
     """
+    import ollama
+    from tqdm import tqdm
+
     selected_models = user_select_models(models)
 
     if not selected_models:
@@ -637,12 +967,13 @@ def push_models(models: List[Model]) -> None:
         print("Push operation canceled.")
         return
 
-    for model in tqdm(selected_models, desc="Pushing models", unit="models", dynamic_ncols=True):
+    for model in tqdm(selected_models, desc="Pushing models", unit="models", dynamic_ncols=True, mininterval=0.5):
         ollama.push(model.name)
 
     print(f"Pushed {len(selected_models)} models successfully.")
 
 
+@lru_cache(maxsize=64)
 def ftStr(word: str, emphasis_index=0, emphasis_span=1) -> str:
     """
     Formats a string with escape chars to bold and underline chosen chars.
@@ -744,6 +1075,11 @@ if __name__ == "__main__":
                                      "OLLAMAUTIL_INTERNAL_DIR and OLLAMAUTIL_EXTERNAL_DIR to point "
                                      "to the \033[1mmodels/\033[0m directory in your internal and "
                                      "external caches, respectively.]]")
+    parser.add_argument("--verify", action="store_true",
+                        help="hash-check every copied file, including copies the "
+                        "filesystem cloned or the kernel made (userspace copies are always checked)")
+    args = parser.parse_args()
+    VERIFY_ALL_COPIES = args.verify
     # define the default source directories (no training delimiter)
     # points to path of internal "modules" directory
     global ollama_int_dir
@@ -756,6 +1092,8 @@ if __name__ == "__main__":
         ('internal', ollama_int_dir),
         ('external', ollama_ext_dir)
     ]
+    global cache_by_name
+    cache_by_name = {cache: (cache, path) for cache, path in valid_caches}
     # Note that this should be set as '["val1" "val2"]' in the environment global other this won't load properly
     try:
         global ollama_file_ignore
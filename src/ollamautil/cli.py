@@ -1,7 +1,8 @@
 import argparse
 from prettytable import PrettyTable
 from .utils import ftStr
-from .ollamautil import build_ext_int_comb_filelist, display_models_table, migrate_cache_user, toggle_int_ext_cache, remove_from_cache, pull_models, push_models
+from . import ollamautil
+from .ollamautil import build_ext_int_comb_filelist, display_models_table, invalidate_filelist_cache, migrate_cache_user, toggle_int_ext_cache, remove_from_cache, pull_models, push_models
 import os
 import ast
 
@@ -38,6 +39,10 @@ def process_choice(choice: str, combined, models_table: PrettyTable|None = None)
     else:
         print("Invalid choice, please try again.")
 
+    if choice in ['1', 'c', 'copy', '3', 'r', 'remove', '4', 'p', 'pull']:
+        # these wrote to the caches; drop the cached listings so the next one rescans rather than trusting directory mtimes
+        invalidate_filelist_cache()
+
 def main() -> None:
     '''
     Display main menu and basic high-level handling.
@@ -50,6 +55,10 @@ def main() -> None:
     except:
         print("\033[1mOLLAMAUTIL_FILE_IGNORE not set, using defaults.\033[0m")
         ollama_file_ignore = ['.DS_Store']
+    try:
+        ollamautil.COPY_WORKERS = max(1, int(os.getenv("OLLAMAUTIL_COPY_WORKERS", ollamautil.COPY_WORKERS)))
+    except ValueError:
+        print(f"\033[1mOLLAMAUTIL_COPY_WORKERS is not a number, using {ollamautil.COPY_WORKERS}.\033[0m")
 
     if not ollama_ext_dir or not ollama_int_dir:
         print("Warning: Required environment variables not configured:")
@@ -59,7 +68,7 @@ def main() -> None:
 
     # Assuming 'combined' is your list of models and weights
     while True:
-        # re-build the table every time you return to the main menu
+        # re-build the table when returning to the main menu; the listing is reused if the caches haven't changed
         _, _, combined = build_ext_int_comb_filelist()
         models_table = display_models_table(combined)
         choice = main_menu()
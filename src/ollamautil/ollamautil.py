@@ -23,74 +23,183 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # ---------------------------
 import os
+import sys
 import json
 import ast
 import argparse
 import hashlib
+import mmap
+from contextlib import nullcontext
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from prettytable import PrettyTable
-from tqdm import tqdm as tqdm
 from typing import List, Dict, Tuple
 import shutil
-import ollama
 import re
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # FILE_LIST_IGNORE = ['.DS_Store'] # Duplicate removed
-FILE_LIST_IGNORE = ['.DS_Store']
+FILE_LIST_IGNORE = frozenset({'.DS_Store'})
 ollama_ext_dir = '/path/to/external/ollama'
 ollama_int_dir = '/path/to/internal/ollama'
+# read/write size for manifest and blob copies
+COPY_BUFSIZE = 1 << 20
+# linux/fs.h _IOW(0x94, 9, int): clone a whole file on copy-on-write filesystems
+FICLONE = 0x40049409
+# <sys/fcntl.h> on macOS, for Pythons whose fcntl module doesn't export it
+F_NOCACHE = 48
+# number of blobs copied concurrently during a migration; cli.main() reads OLLAMAUTIL_COPY_WORKERS into it
+COPY_WORKERS = 4
+# number of concurrent ollama.pull / ollama.push requests
+OLLAMA_WORKERS = 8
+# last build_ext_int_comb_filelist() result and the walk_dir directory mtimes it was built from
+_FILELIST_CACHE = {}
+# last models table built by display_models_table, the combined key it was built from and its rendered text
+_TABLE_CACHE = {}
+# walk_dir results: directory -> (((path, st_mtime_ns) of each directory walked), sorted file paths)
+_walk_cache = {}
+# cache currently symlinked at ~/.ollama/models, see get_curnow_cache
+_CURNOW_CACHE = None
+# destination blobs copied and verified during this session
+_verified_blobs = set()
+# characters permitted in a select_models selection, e.g. "1, 3, 12-15"
+_SELECTION_RE = re.compile(r"^[\d,\s\-]+$")
+# accepted answers for get_user_confirmation
+_YES_RESPONSES = frozenset({"yes", "y"})
+_NO_RESPONSES = frozenset({"no", "n"})
 
 
 def walk_dir(directory):
-    files = []
-    for root, dirs, file_list in os.walk(directory):
-        for filename in file_list:
-            if filename in FILE_LIST_IGNORE:
-                continue
-
-            if os.access(os.path.join(root, filename), os.R_OK):
-                files.append(os.path.join(root, filename))
-            else:
-                print(f"User doesn't have access to {root}/{filename}. Skipping...")
-    return sorted(files)
+    '''
+    Return the sorted paths of every file under directory.
+    The listing is cached with the mtime of each directory it came from; adding or
+    removing an entry changes its parent's mtime, so the cache is reused only while
+    a stat of every directory matches.
+    '''
+    cached = _walk_cache.get(directory)
+    if cached is not None and cached[0] == _dir_mtimes(mtime[0] for mtime in cached[0]):
+        return list(cached[1])
+    dir_mtimes = []
+    files = sorted(iter_files(directory, dir_mtimes))
+    _walk_cache[directory] = (tuple(dir_mtimes), files)
+    return list(files)
+
+def _dir_mtimes(directories) -> tuple:
+    mtimes = []
+    for path in directories:
+        try:
+            mtimes.append((path, os.stat(path).st_mtime_ns))
+        except OSError:
+            mtimes.append((path, None))
+    return tuple(mtimes)
+
+def iter_files(directory, dir_mtimes: list|None = None):
+    '''
+    Yield the path of every file under directory, skipping FILE_LIST_IGNORE, in the order
+    they are found; nothing is materialised or sorted (walk_dir does that, and caches it).
+    Uses os.scandir so file/dir checks come from the directory entry itself
+    rather than a stat per file. Unreadable files are not filtered here;
+    they fail when opened.
+    If dir_mtimes is given, (path, st_mtime_ns) of each directory is appended to it.
+    '''
+    if dir_mtimes is not None:
+        dir_mtimes.extend(_dir_mtimes([directory]))
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name in FILE_LIST_IGNORE:
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    yield from iter_files(entry.path, dir_mtimes)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry.path
+    except PermissionError:
+        print(f"User doesn't have access to {directory}. Skipping...")
+    except OSError:
+        # e.g. a cache that doesn't exist (yet); os.walk ignored these too
+        return
 
 def display_models_table(combined: List[List], table: PrettyTable|None = None):
-    table = get_models_table(combined,table=table) if not table else table
-    print(table)
+    if not table:
+        # reuse the last table and its rendered text while combined is unchanged
+        key = tuple((model_name, tuple(external_weights), tuple(internal_weights))
+                    for model_name, external_weights, internal_weights in combined)
+        if _TABLE_CACHE.get("key") != key:
+            table = get_models_table(combined)
+            _TABLE_CACHE.update(key=key, table=table, rendered=table.get_string())
+        table = _TABLE_CACHE["table"]
+    print(render_table(table))
     print(f'\nCurrent cache set to:    \033[4m{get_curnow_cache()}\033[0m')
     return table
 
-def get_models_table(combined: List[List], table: PrettyTable|None = None):
+def render_table(table: PrettyTable) -> str:
+    '''Return the text of table, reusing the cached render for the table display_models_table built.'''
+    if _TABLE_CACHE.get("table") is table:
+        return _TABLE_CACHE["rendered"]
+    return table.get_string()
+
+def get_models_table(combined: List[List], table: PrettyTable|None = None, rows: List[Tuple[str, str, str, str, str]]|None = None):
+    '''
+    Add the rows of combined to table, numbered in a leading "No." column, creating the table if not given.
+    A given table must already have the No., Lib, Model, Tag, External and Internal fields.
+    '''
     if not table:
-        table = PrettyTable(['Lib', 'Model', 'Tag', 'External', 'Internal'],
+        table = PrettyTable(['No.', 'Lib', 'Model', 'Tag', 'External', 'Internal'],
                         title="Ollama GPTs Installed",
                         left_padding_width=3,
                         right_padding_width=2,
                         vertical_align_char='c',
                         horizontal_align_char='c')
 
-    # Flatten combined into a format suitable for PrettyTable
-    table_rows = []
-    for model_info in combined:
-        model_name, external_weights, internal_weights = model_info
-        all_weights = set(external_weights + internal_weights)
-        for weight in all_weights:
-            exists_in_external = "Yes" if weight in external_weights else "No"
-            exists_in_internal = "Yes" if weight in internal_weights else "No"
-            table_rows.append([model_name.split(os.sep)[-2],
-                               model_name.split(os.sep)[-1],
-                               weight,
-                               exists_in_external,
-                               exists_in_internal])
-
-    # Sort rows by model name and then by weight for consistency
-    table_rows.sort(key=lambda x: (x[0], x[1]))
-
-    # Add row index and append rows to the table
-    table.add_rows(table_rows)
-    table.add_autoindex("No.")
+    table_rows = get_models_rows(combined) if rows is None else rows
+
+    # Number the rows as they are added, rather than walking them again with add_autoindex
+    table.add_rows([(index, *row) for index, row in enumerate(table_rows, len(table.rows) + 1)])
 
     return table
 
+def get_models_rows(combined: List[List]) -> List[Tuple[str, str, str, str, str]]:
+    '''
+    Flatten combined into one (lib, model, tag, external, internal) tuple per model tag,
+    in the order they are shown in the models table. Row n of the table is rows[n - 1].
+    '''
+    # Split each model name once and sort the models, then emit each model's rows in tag order,
+    # so the rows come out sorted without sorting the whole table
+    models = sorted(((tuple(model_name.rsplit(os.sep, 2)[-2:]), external_weights, internal_weights)
+                     for model_name, external_weights, internal_weights in combined),
+                    key=itemgetter(0))
+    table_rows = []
+    for (lib, model), external_weights, internal_weights in models:
+        table_rows.extend((lib, model, weight, exists_in_external, exists_in_internal)
+                          for weight, exists_in_external, exists_in_internal
+                          in _merge_weights(sorted(set(external_weights)), sorted(set(internal_weights))))
+    return table_rows
+
+def _merge_weights(external_weights: List[str], internal_weights: List[str]):
+    '''
+    Merge two sorted lists of weights into (weight, in external, in internal) rows in sorted order,
+    advancing whichever side has the lesser weight, or both when they match.
+    '''
+    i = j = 0
+    while i < len(external_weights) and j < len(internal_weights):
+        if external_weights[i] == internal_weights[j]:
+            yield external_weights[i], "Yes", "Yes"
+            i += 1
+            j += 1
+        elif external_weights[i] < internal_weights[j]:
+            yield external_weights[i], "Yes", "No"
+            i += 1
+        else:
+            yield internal_weights[j], "No", "Yes"
+            j += 1
+    for weight in external_weights[i:]:
+        yield weight, "Yes", "No"
+    for weight in internal_weights[j:]:
+        yield weight, "No", "Yes"
+
 def build_ext_int_comb_filelist() -> Tuple[dict, dict, list]:
     '''
     Builds and returns external and internal model file lists.
@@ -100,19 +209,30 @@ def build_ext_int_comb_filelist() -> Tuple[dict, dict, list]:
             - external_dict (Dict): A dictionary with external models and their weights.
             - internal_dict (Dict): A dictionary with internal models and their weights.
             - combined_list (List): A list of combined information from both dictionaries.
+
+    The result is reused while the mtime of every manifests directory walk_dir visited is
+    unchanged, until invalidate_filelist_cache() is called, so the menu and remove_from_cache
+    share one listing.
     '''
-    # Assuming walk_dir is defined elsewhere and works as expected
-    external_files = walk_dir(ollama_ext_dir + "/manifests")
-    internal_files = walk_dir(ollama_int_dir + "/manifests")
+    manifest_dirs = (ollama_ext_dir + "/manifests", ollama_int_dir + "/manifests")
+    # Walk both caches at once; each walk is bound by the latency of its drive
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        external_future = executor.submit(walk_dir, manifest_dirs[0])
+        internal_future = executor.submit(walk_dir, manifest_dirs[1])
+        external_files, internal_files = external_future.result(), internal_future.result()
+
+    # walk_dir has just checked every directory's mtime; a new or removed tag changes its model's directory
+    signature = tuple(_walk_cache[directory][0] if directory in _walk_cache else None for directory in manifest_dirs)
+    if None not in signature and _FILELIST_CACHE.get("signature") == signature:
+        return _FILELIST_CACHE["filelist"]
 
     def process_files(files):
         models_dict = {}
         for file_path in files:
             # Adjusted to accommodate additional directory layers
-            print(f"file_path: {file_path}") # Debug log
-            parts = file_path.split("/")[-4:]  # This will select superparent/parent/model/weight
+            parts = file_path.rsplit(os.sep, 4)[-4:]  # This will select superparent/parent/model/weight
             # Remove 'manifests/' prefix from the key
-            dict_key = "/".join(parts[:-1]).replace('manifests/', '')  # Modified this line
+            dict_key = f"{parts[0]}{os.sep}{parts[1]}{os.sep}{parts[2]}".replace(f'manifests{os.sep}', '')  # Modified this line
             models_dict.setdefault(dict_key, []).append(parts[-1])  # Append weight
         return models_dict
 
@@ -139,8 +259,18 @@ def build_ext_int_comb_filelist() -> Tuple[dict, dict, list]:
         internal_weights = internal_dict.get(model_name, [])
         combined.append([model_name, external_weights, internal_weights])
 
+    _FILELIST_CACHE["signature"] = signature
+    _FILELIST_CACHE["filelist"] = (external_dict, internal_dict, combined)
     return external_dict, internal_dict, combined
 
+def invalidate_filelist_cache() -> None:
+    '''
+    Forget the cached build_ext_int_comb_filelist() result and the walk_dir listings it was built
+    from, e.g. after writing to a cache, so the next listing doesn't rely on directory mtimes.
+    '''
+    _FILELIST_CACHE.clear()
+    _walk_cache.clear()
+
 
 def get_user_confirmation(prompt):
     '''
@@ -152,30 +282,46 @@ def get_user_confirmation(prompt):
     Returns:
         bool: True if the user confirms (yes), False otherwise (no).
     '''
-    valid_responses = {"yes": True, "y": True, "no": False, "n": False}
     prompt = prompt.strip()
     while True:
         # Ask the user and get the response
-        user_response = input(f"{prompt} (yes/no): ").lower()
+        user_response = input(f"{prompt} (yes/no): ").strip().lower()
 
         # Validate and process the response
-        if user_response in valid_responses:
-            return valid_responses[user_response]
-        else:
-            print("Invalid response. Please answer 'yes' or 'no'.")
+        if user_response in _YES_RESPONSES:
+            return True
+        if user_response in _NO_RESPONSES:
+            return False
+        print("Invalid response. Please answer 'yes' or 'no'.")
 
 def get_curnow_cache():
-    home = os.path.expanduser("~")
-    current_path = os.path.realpath(os.path.join(home, '.ollama', 'models'))
-    current_path = os.path.realpath(os.path.join(home, '.ollama', 'models'))
+    '''
+    Return "internal" or "external" depending on where ~/.ollama/models points.
+    The result is remembered until _toggle_cache changes the symlink.
+    Returns None, without remembering it, if the link points at neither cache.
+    '''
+    global _CURNOW_CACHE
+    if _CURNOW_CACHE is not None:
+        return _CURNOW_CACHE
+    link_path = os.path.join(os.path.expanduser("~"), '.ollama', 'models')
+    try:
+        # a single readlink, rather than realpath's lstat of every component
+        current_path = os.readlink(link_path)
+    except OSError:
+        current_path = os.path.realpath(link_path)
+    if current_path not in (ollama_int_dir, ollama_ext_dir):
+        current_path = os.path.realpath(link_path)
     curnow = None
     if current_path == ollama_int_dir:
         curnow = "internal"
     elif current_path == ollama_ext_dir:
         curnow = "external"
     else:
-        AssertionError(f"Error: somehow managed to get to {current_path}")
+        # not one of our caches, e.g. before the first toggle; check again next time
+        print(f"Error: somehow managed to get to {current_path}")
+        return curnow
 
+    _CURNOW_CACHE = curnow
     return curnow
 
 def toggle_int_ext_cache(combined, table: PrettyTable = None) -> str:
@@ -186,6 +332,15 @@ def toggle_int_ext_cache(combined, table: PrettyTable = None) -> str:
     }
 
     table = display_models_table(combined=combined, table=table)
+    if curnow is None:
+        # the link points at neither cache, so there is no "other" one; offer both
+        choice = input("~/.ollama/models doesn't point at either cache. Point it at (1) internal or (2) external? (q) exit to menu: ").strip()
+        if choice in ('1', '2'):
+            _toggle_cache("internal" if choice == '1' else "external")
+        else:
+            print("No changes to Ollama cache pointer made.")
+        return
+
     print("Review which models are available in which cache carefully.\n\n")
     if get_user_confirmation("Would you like to move cache files first? (Note: will not overwrite existing files): "):
         direction = '1' if curnow == "external" else '0'
@@ -197,27 +352,55 @@ def toggle_int_ext_cache(combined, table: PrettyTable = None) -> str:
     else: print(f"No changes to Ollama cache pointer made. Still using \033[1;4m{curnow.upper()}\033[0m.")
 
 def _toggle_cache(toggle_target: str):
+    global _CURNOW_CACHE
     if toggle_target == "internal":
-        os.system(f"ln -s -F {ollama_int_dir} ${{HOME}}/.ollama/")
+        if not _replace_models_link(ollama_int_dir):
+            return
+        _CURNOW_CACHE = "internal"
         print(f"Changed .ollama symlink to look to INTERNAL drive.")
         return "external"
     elif toggle_target == "external":
-        os.system(f"ln -s -F {ollama_ext_dir} ${{HOME}}/.ollama/")
+        if not _replace_models_link(ollama_ext_dir):
+            return
+        _CURNOW_CACHE = "external"
         print(f"Changed .ollama symlink to look to EXTERNAL drive.")
         return "internal"
     else:
         print(f'Cache target not toggled. Requested target \'{toggle_target}\' not defined.')
 
-def select_models(table: PrettyTable, prompt: str | None = "", allow_multiples: bool = True, bypassGetAll: bool = False) -> List[List[str]]:
+def _replace_models_link(target_dir: str) -> bool:
+    '''
+    Point ~/.ollama/models at target_dir. A temporary link is renamed over the old one, so the swap is atomic.
+    Returns False, leaving the old link in place and printing why, if the swap fails.
+    '''
+    link_path = os.path.join(os.path.expanduser("~"), ".ollama", "models")
+    tmp_path = link_path + ".tmp"
+    try:
+        if os.path.lexists(tmp_path):
+            os.unlink(tmp_path)
+        os.symlink(target_dir, tmp_path)
+        os.replace(tmp_path, link_path)
+    except OSError as e:
+        # e.g. ~/.ollama/models is a real directory rather than a symlink, or ~/.ollama doesn't exist
+        if os.path.lexists(tmp_path):
+            os.unlink(tmp_path)
+        print(f"\033[1mUnable to point {link_path} at {target_dir}: {e}\033[0m")
+        return False
+    return True
+
+def select_models(table: PrettyTable, prompt: str | None = "", allow_multiples: bool = True, bypassGetAll: bool = False, rows: List[Tuple]|None = None) -> List[List[str]]:
+    '''
+    Prompt for model/tag numbers from table and return the selected (lib, model, tag) entries.
+    rows are the table's rows as returned by get_models_rows; if not given they are read back from the table.
+    '''
     def is_valid_input(user_input) -> bool:
-        pattern = r"^[\d,0-9\s\-]+$"
-        if re.match(pattern, user_input):
-            return True
-        else:
-            return False
+        return _SELECTION_RE.match(user_input) is not None
 
-    selected_files = []
-    print(table)
+    if rows is None:
+        # table.rows includes the "No." index column
+        rows = [row[1:] for row in table.rows]
+
+    print(render_table(table))
 
     if prompt is None:
         base_prompt = "Select model/tag items to act on using numbers (e.g. 1, 3, 12-15) or all"
@@ -226,45 +409,44 @@ def select_models(table: PrettyTable, prompt: str | None = "", allow_multiples:
 
     while True:  # Loop until valid input is received
         user_input = "ALL" if bypassGetAll else input(f"{base_prompt}: ").strip()
-        if not is_valid_input(user_input):
-            print(f"Invalid input, contains unpermitted characters: \'{user_input}\'. Please enter a valid selection.")
-            continue
-
         if user_input == "":
             print("No model/tag option selected. Quitting...")
             return []
 
-        # handle special case of "all" option (i.e. all models)
+        # handle special case of "all" option (i.e. all models), otherwise split by comma
         if user_input.upper() == "ALL":
-            user_input = [int(num) for num in range(1, len(table._rows) + 1)]
-
-        # Remove leading/trailing whitespaces and split by comma
-        # input() return type is 'str'`
-        if type(user_input) == str:
-            user_input = [num.strip() for num in user_input.split(",")]
+            tokens = [str(num) for num in range(1, len(rows) + 1)]
+        elif not is_valid_input(user_input):
+            print(f"Invalid input, contains unpermitted characters: \'{user_input}\'. Please enter a valid selection.")
+            continue
+        else:
+            tokens = [num.strip() for num in user_input.split(",")]
 
         try:
             ranges = []
-            for item in user_input:
+            for item in tokens:
                 if '-' in item:
                     parts = item.split('-')
                     if len(parts) != 2:
                         print(f"Invalid range: \'{item}\'. Please enter a valid range. Original input:\n    '{user_input}'")
                         continue
-                    start, end = map(lambda x: int(x.strip()), parts)
+                    start, end = map(int, parts)
                     ranges.extend(range(start, end + 1))
                 else:
                     ranges.append(int(item))
 
             # Remove duplicates and sort the list
             ranges = sorted(set(ranges))
-
-            for i in ranges:
-                selected_files.append(table._rows[i - 1][1:-2])
         except ValueError:
             print(f"Invalid input '{user_input}'. Please enter numbers separated by commas.")
             continue
 
+        # rows[i - 1] would wrap around for 0 and raise IndexError past the end
+        if ranges and (ranges[0] < 1 or ranges[-1] > len(rows)):
+            print(f"Invalid selection '{user_input}'. Please choose numbers between 1 and {len(rows)}.")
+            continue
+        selected_files = [list(rows[i - 1][0:3]) for i in ranges]
+
         if not allow_multiples and len(selected_files) > 1:
             print("Multiple selections are not allowed. Please select only one model.")
             continue
@@ -277,6 +459,7 @@ def pull_models(combined, table: PrettyTable|None = None, prompt: str|None = Non
     # Call 'select_models()' function and store the result in a list of files to pull
     sel_dirfil = select_models(table, prompt=prompt, allow_multiples=allow_multiples)
 
+    model_paths = []
     for weight in sel_dirfil:
         # construct the model name/path for Ollama.com specifically
         if weight[0] != 'library':
@@ -284,13 +467,16 @@ def pull_models(combined, table: PrettyTable|None = None, prompt: str|None = Non
         else:
             model_path = weight[1] + ":" + weight[2]
         print(f'Pulling {model_path} from Ollama.com...')
-        ollama.pull(model_path)
+        model_paths.append(model_path)
+    import ollama
+    _run_concurrently(ollama.pull, model_paths, desc="Pulling")
 
 def push_models(combined, table: PrettyTable|None = None):
     if table is None: table = display_models_table(combined)
 
     sel_dirfil = select_models(table)
 
+    model_paths = []
     for weight in sel_dirfil:
         # construct the model name/path for Ollama.com specifically
         if weight[0] != 'library':
@@ -302,7 +488,17 @@ def push_models(combined, table: PrettyTable|None = None):
                   \n  eg. <username>/{':'.join(weight[1:2])}")
             continue
         print(f'Pushing {model_path} to Ollama.com...')
-        ollama.push(model_path)
+        model_paths.append(model_path)
+    import ollama
+    _run_concurrently(ollama.push, model_paths, desc="Pushing")
+
+def _run_concurrently(func, model_paths: List[str], desc: str) -> None:
+    '''Call func (ollama.pull or ollama.push) for each model path on up to OLLAMA_WORKERS threads.'''
+    if not model_paths:
+        return
+    from tqdm import tqdm
+    with ThreadPoolExecutor(max_workers=min(OLLAMA_WORKERS, len(model_paths))) as executor:
+        list(tqdm(executor.map(func, model_paths), total=len(model_paths), desc=desc, unit='model'))
 
 def migrate_cache_user(table, combined):
     if combined == []:
@@ -318,102 +514,420 @@ def migrate_cache_user(table, combined):
 
     which_direction = input("Move from:\n(1) external to internal\n(2) internal to external\n(1 or 2): ")
     overwrite = input("If the model already exists, should it be overwritten? (y/N): ").lower() in ("y", "yes")
+    verify = False
+    if not overwrite:
+        verify = input("Verify checksums of blobs already in the destination? (y/N): ").lower() in ("y", "yes")
 
-    migrate_cache(table=table, combined=combined, selected_files=selected_files, bypassGetAll=False, overwrite=overwrite, which_direction=which_direction)
+    migrate_cache(table=table, combined=combined, selected_files=selected_files, bypassGetAll=False, overwrite=overwrite, which_direction=which_direction, verify=verify)
 
 
-def migrate_cache(table: PrettyTable|None = None, combined: list = [], selected_files: list = [], which_direction: str = None, bypassGetAll: bool = False, overwrite: bool = False) -> None:
+def migrate_cache(table: PrettyTable|None = None, combined: list = [], selected_files: list = [], which_direction: str = None, bypassGetAll: bool = False, overwrite: bool = False, verify: bool = False) -> None:
     source_files = []
-    sel_dirfil = [os.sep.join(tmpvar) for tmpvar in selected_files]
+    if bypassGetAll and not selected_files:
+        # migrate every model, e.g. before toggling the cache
+        selected_files = [row[0:3] for row in get_models_rows(combined)] if combined else [row[1:4] for row in table.rows]
 
     # Define source and destination directories
     source_dir = ollama_ext_dir if which_direction == '1' else ollama_int_dir
     dest_dir = ollama_int_dir if which_direction == '1' else ollama_ext_dir
 
-    # Get the files from the selected directories
-    for file_path in walk_dir(os.path.join(source_dir, "manifests")):
-        # Normalize the file path to use consistent separators
-        normalized_path = os.path.normpath(file_path)
-
-        # Extract the last three segments of the path
-        path_segments = normalized_path.split(os.sep)[-3:]
-
-        # Re-join the last two segments and check if this combination is in sel_dirfil
-        dir_file_combination = os.sep.join(path_segments)
-        if dir_file_combination in sel_dirfil:
-            source_files.append(file_path)
-
+    # Build the selected manifest paths directly rather than walking the whole manifests tree.
+    # Selections are lib/model/tag; the registry directory above them (e.g. registry.ollama.ai) isn't in the table.
+    manifests_dir = os.path.join(source_dir, "manifests")
+    try:
+        registries = os.listdir(manifests_dir)
+    except FileNotFoundError:
+        registries = []
+    for selected in selected_files:
+        for registry in registries:
+            file_path = os.path.join(manifests_dir, registry, *selected)
+            if os.path.isfile(file_path):
+                source_files.append(file_path)
+
+    # Work out every manifest and blob to copy before copying any of them
+    blob_jobs = {}
+    existing_dest_blobs = list_blobs(dest_dir)
+    # blob_copy_jobs adds the queued blobs to existing_dest_blobs; remember what was really there
+    blobs_in_dest = frozenset(existing_dest_blobs)
+    manifest_copies = []
     for source_file in source_files:
-        dest_file = os.path.join(dest_dir, *source_file.split(os.path.sep + 'models' + os.path.sep)[1:])
+        if not os.access(source_file, os.R_OK):
+            print(f"User doesn't have access to {source_file}. Skipping...")
+            continue
+        dest_file = os.path.join(dest_dir, os.path.relpath(source_file, source_dir))
+        manifest_copies.append((source_file, dest_file))
+
+        # Manifests often share blobs, so collect them before copying
+        blob_jobs.update(blob_copy_jobs(source_file=source_file, source_dir=source_dir, dest_dir=dest_dir, overwrite=overwrite, existing_dest_blobs=existing_dest_blobs, verify=verify))
+
+    # one stat per source, shared by the space check and the blob progress bar
+    sizes = _source_sizes([source_file for source_file, _ in manifest_copies] + [source_blob for source_blob, _ in blob_jobs.values()])
+    # blobs already in the destination (overwrite) are rewritten in place and reuse their own space
+    replaced = _source_sizes([dest_blob for _, dest_blob in blob_jobs.values() if os.path.basename(dest_blob) in blobs_in_dest])
+    needed = sum(sizes.values()) - sum(replaced.values())
+    # blobs that can be hard-linked (see _copy_blob) take no space
+    shares_blocks = (blob_jobs and _same_device(source_dir, dest_dir)
+                     and _can_link(next(iter(blob_jobs.values()))[0], dest_dir))
+    if not shares_blocks and not _has_free_space(dest_dir, needed):
+        return
 
-        # Ensure the destination directory exists
-        os.makedirs(os.path.dirname(dest_file), exist_ok=True)
+    created_dirs = set()
+    for source_file, dest_file in manifest_copies:
+        # Ensure the destination directory exists; tags of one model share a directory
+        dest_file_dir = os.path.dirname(dest_file)
+        if dest_file_dir not in created_dirs:
+            os.makedirs(dest_file_dir, exist_ok=True)
+            created_dirs.add(dest_file_dir)
 
         # Copy the file if overwrite is True or if the file does not exist in the destination
-        if overwrite or not os.path.exists(dest_file):
-            with tqdm(total=os.stat(source_file).st_size, unit='B', unit_scale=True, desc=f"Copying {os.path.basename(dest_file)}") as pbar:
-                with open(source_file, 'rb') as src, open(dest_file, 'wb') as dst:
-                    for chunk in iter(lambda: src.read(4096), b""):
-                        dst.write(chunk)
-                        pbar.update(len(chunk))
-                copy_metadata(source_file, dest_file)
-            print(f"Copied {source_file} to {dest_file}")
+        try:
+            copy_with_progress(source_file, dest_file, desc=f"Copying {os.path.basename(dest_file)}", overwrite=overwrite)
+        except FileExistsError:
+            pass
         else:
-            None
-
-        # Now deal with the blobs
-        copy_blob_files(source_file=source_file, dest_file=dest_file, source_dir=source_dir, dest_dir=dest_dir, overwrite=overwrite)
+            copy_metadata(source_file, dest_file)
+            print(f"Copied {source_file} to {dest_file}")
 
         # Now tell Ollama that these exist again
         # os.system(f"ollama pull {':'.join(os.path.normpath(source_file).split(os.sep)[-2:])}")
 
+    copy_blobs(blob_jobs, sizes)
+    invalidate_filelist_cache()
+
+def _source_sizes(source_files: List[str]) -> Dict[str, int]:
+    '''Return source file -> size in bytes, with one stat each. Missing sources are left out; the copy reports them.'''
+    sizes = {}
+    for source_file in source_files:
+        try:
+            sizes[source_file] = os.stat(source_file).st_size
+        except OSError:
+            pass
+    return sizes
+
+def _can_link(source_blob: str, dest_dir: str) -> bool:
+    '''
+    Hard-link source_blob into dest_dir/blobs under a probe name and remove it again.
+    Same-device caches can still be on a filesystem without links (e.g. exFAT), where every blob is byte-copied.
+    '''
+    probe = os.path.join(dest_dir, "blobs", ".ollamautil-link-probe")
+    try:
+        os.makedirs(os.path.dirname(probe), exist_ok=True)
+        if os.path.lexists(probe):
+            os.remove(probe)
+        os.link(source_blob, probe)
+    except OSError:
+        return False
+    os.remove(probe)
+    return True
+
+def _has_free_space(dest_dir: str, needed: int) -> bool:
+    '''
+    Check that dest_dir has room for needed more bytes, so a migration that won't fit
+    stops before anything is copied rather than part way through a blob.
+    Prints how much is missing and returns False if it doesn't fit.
+    '''
+    try:
+        free = shutil.disk_usage(dest_dir).free
+    except OSError:
+        return True
+    if needed <= free:
+        return True
+    from tqdm import tqdm
+    print(f"\033[1mNot enough space in {dest_dir}: the migration needs {tqdm.format_sizeof(needed, 'B', 1024)}, "
+          f"only {tqdm.format_sizeof(free, 'B', 1024)} is free. Nothing was copied.\033[0m")
+    return False
+
 # Assuming source_file is the path to the manifest file
 def copy_blob_files(source_file, dest_file, source_dir, dest_dir, overwrite):
+    copy_blobs(blob_copy_jobs(source_file, source_dir, dest_dir, overwrite))
+
+def blob_copy_jobs(source_file, source_dir, dest_dir, overwrite, existing_dest_blobs: set|None = None, verify: bool = False) -> Dict[str, Tuple[str, str]]:
+    '''
+    Read a manifest and work out which of its blobs need copying.
+    Returns a dict of blob digest -> (source_blob, dest_blob), so blobs shared between
+    manifests can be merged into a single copy.
+    existing_dest_blobs is a set of blob filenames already in dest_dir/blobs (see list_blobs);
+    it is read from disk if not given, and the queued blobs are added to it.
+    Blobs already in the destination are trusted by name unless their size differs from
+    the source; with verify=True they are also hashed, and copied again if the digest is wrong.
+    '''
+    if existing_dest_blobs is None:
+        existing_dest_blobs = list_blobs(dest_dir)
     # load manifest
     blob_hash_prefix = "sha256-"
     bb_px_len = len(blob_hash_prefix)
-    manifest_data = []
+    manifest_data = set()
     try:
-        with open(source_file, 'r') as f:
-            rawdata = json.load(f)
+        rawdata = load_manifest(source_file)
     except Exception as e:
         print(f"Error loading manifest: {e}")
         assert rawdata is not None
     else:
-        for layer in rawdata['layers']:
-            if "ollama.image" in layer['mediaType']:
-                manifest_data.append(layer['digest'][bb_px_len:])
-        manifest_data.append(rawdata['config']['digest'][bb_px_len:])
-        manifest_data.extend([layer['digest'][bb_px_len:] for layer in rawdata['layers']])
+        manifest_data = {rawdata['config']['digest'][bb_px_len:]} | {layer['digest'][bb_px_len:] for layer in rawdata['layers']}
 
+    jobs = {}
+    # join the blobs directories once; each blob path is then a plain concatenation
+    source_blob_prefix = os.path.join(source_dir, "blobs", blob_hash_prefix)
+    dest_blob_prefix = os.path.join(dest_dir, "blobs", blob_hash_prefix)
     for blob_digest in manifest_data:
-        source_blob = os.path.join(source_dir, "blobs", blob_hash_prefix + blob_digest)
-        dest_blob_dir = os.path.join(dest_dir, "blobs")
-        dest_blob = os.path.join(dest_blob_dir, blob_hash_prefix + blob_digest)
+        blob_name = blob_hash_prefix + blob_digest
+        source_blob = source_blob_prefix + blob_digest
+        dest_blob = dest_blob_prefix + blob_digest
+        exists_in_dest = blob_name in existing_dest_blobs
+
+        # Already copied and verified during this session
+        if dest_blob in _verified_blobs and exists_in_dest:
+            continue
+        # Hard-linked by an earlier migration: there is nothing to copy, and rewriting dest would truncate the source
+        if exists_in_dest and _same_file(source_blob, dest_blob):
+            continue
+        # Copy the blob file if overwrite is True or if the blob does not exist in the destination
+        if overwrite or not exists_in_dest or not _dest_blob_intact(source_blob, dest_blob, blob_digest, verify):
+            jobs[blob_digest] = (source_blob, dest_blob)
+            existing_dest_blobs.add(blob_name)
+    return jobs
+
+def _same_file(source_blob: str, dest_blob: str) -> bool:
+    try:
+        return os.path.samefile(source_blob, dest_blob)
+    except OSError:
+        return False
 
-        # Ensure the destination blob directory exists
+def _dest_blob_intact(source_blob: str, dest_blob: str, blob_digest: str, verify: bool) -> bool:
+    '''Check an existing destination blob: sizes must match, and with verify, the digest too.'''
+    try:
+        if os.stat(source_blob).st_size != os.stat(dest_blob).st_size:
+            print(f"Size of {dest_blob} doesn't match the source, copying again.")
+            return False
+    except OSError:
+        # nothing to copy from, or nothing there after all; leave it to the copy
+        return not os.path.exists(source_blob)
+    if not verify:
+        return True
+    if blob_sha256(dest_blob) != blob_digest:
+        print(f"Digest of {dest_blob} doesn't match, copying again.")
+        return False
+    _verified_blobs.add(dest_blob)
+    return True
+
+def list_blobs(cache_dir: str) -> set:
+    '''Return the set of blob filenames in cache_dir/blobs, read with a single listdir.'''
+    try:
+        return set(os.listdir(os.path.join(cache_dir, "blobs")))
+    except FileNotFoundError:
+        return set()
+
+def load_manifest(manifest_file: str) -> dict:
+    '''Parse a manifest file, using orjson when it is installed.'''
+    with open(manifest_file, 'rb') as f:
+        data = f.read()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def copy_blobs(jobs: Dict[str, Tuple[str, str]], sizes: Dict[str, int]|None = None) -> None:
+    '''
+    Copy and hash blobs on COPY_WORKERS threads, sharing one progress bar.
+    Blobs whose digest doesn't match are re-checked afterwards on the calling thread,
+    since validate_blob_sha256 may prompt the user.
+    sizes is source blob -> size (see _source_sizes); the blobs are stat'ed here if not given.
+    '''
+    if not jobs:
+        return
+    # Ensure the destination blob directories exist; normally there is just the one
+    for dest_blob_dir in {os.path.dirname(dest_blob) for _, dest_blob in jobs.values()}:
         os.makedirs(dest_blob_dir, exist_ok=True)
 
-        # Copy the blob file if overwrite is True or if the blob does not exist in the destination
-        if overwrite or not os.path.exists(dest_blob):
-            with tqdm(total=os.stat(source_blob).st_size, unit='B', unit_scale=True, desc=f"Copying {blob_digest}") as pbar:
-                with open(source_blob, 'rb') as src, open(dest_blob, 'wb') as dst:
-                    for chunk in iter(lambda: src.read(4096), b""):
-                        dst.write(chunk)
-                        pbar.update(len(chunk))
-                copy_metadata(source_blob, dest_blob)
-            print(f"Copied {source_blob} to {dest_blob}")
-
-            # Validate SHA-256 hash of copied blob
-            validate_blob_sha256(dest_blob, blob_hash_prefix, blob_hash_prefix + blob_digest)
+    # jobs come from one source and one destination cache, so one device check covers them all
+    source_blob, dest_blob = next(iter(jobs.values()))
+    clone = _same_device(os.path.dirname(source_blob), os.path.dirname(dest_blob))
+
+    if sizes is None:
+        sizes = _source_sizes([source_blob for source_blob, _ in jobs.values()])
+    total = sum(sizes.get(source_blob, 0) for source_blob, _ in jobs.values())
+    mismatched = []
+    from tqdm import tqdm
+    with tqdm(total=total, unit='B', unit_scale=True, desc=f"Copying {len(jobs)} blob(s)") as pbar:
+        with ThreadPoolExecutor(max_workers=min(COPY_WORKERS, len(jobs))) as executor:
+            futures = {executor.submit(_copy_blob, source_blob, dest_blob, blob_digest, pbar, clone, sizes.get(source_blob, 0)): blob_digest
+                       for blob_digest, (source_blob, dest_blob) in jobs.items()}
+            for future in as_completed(futures):
+                if not future.result():
+                    mismatched.append(futures[future])
+
+    for blob_digest in mismatched:
+        validate_blob_sha256(jobs[blob_digest][1], "sha256-", "sha256-" + blob_digest)
+
+def _copy_blob(source_blob: str, dest_blob: str, blob_digest: str, pbar, clone: bool = False, size: int = 0) -> bool:
+    '''
+    Copy one blob, hashing it on the way through. Returns True if the digest matched.
+    If clone is True (both caches on one device), a copy-on-write clone is tried first, then
+    a hard link; either shares the source's blocks, so it isn't hashed, and pbar is advanced
+    by size instead.
+    '''
+    if clone:
+        if _clone_file(source_blob, dest_blob):
+            shared = "Cloned"
+        elif _link_file(source_blob, dest_blob):
+            shared = "Linked"
+        else:
+            shared = None
+        if shared:
+            copy_metadata(source_blob, dest_blob)
+            pbar.update(size)
+            pbar.write(f"{shared} {source_blob} to {dest_blob}")
+            return True
 
-def validate_blob_sha256(dest_blob: str, blob_hash_prefix: str, expected_digest: str = ""):
+    # Hash the source bytes as they stream through the copy
     sha256_hash = hashlib.sha256()
+    copy_with_progress(source_blob, dest_blob, hasher=sha256_hash, pbar=pbar)
+    copy_metadata(source_blob, dest_blob)
+    pbar.write(f"Copied {source_blob} to {dest_blob}")
+
+    if sha256_hash.hexdigest() != blob_digest:
+        return False
+    _verified_blobs.add(dest_blob)
+    pbar.write(f"Checksum verified: {dest_blob}")
+    return True
+
+def _same_device(source_dir: str, dest_dir: str) -> bool:
+    try:
+        return os.stat(source_dir).st_dev == os.stat(dest_dir).st_dev
+    except OSError:
+        return False
+
+def _clone_file(source_file: str, dest_file: str) -> bool:
+    '''
+    Make dest_file a copy-on-write clone of source_file: clonefile(2) on macOS (APFS),
+    the FICLONE ioctl on Linux (Btrfs, XFS). Returns False if the filesystem can't clone,
+    in which case the caller should copy the bytes instead.
+    '''
+    if sys.platform == "darwin":
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        # clonefile won't replace an existing file
+        if os.path.lexists(dest_file):
+            os.remove(dest_file)
+        return libc.clonefile(os.fsencode(source_file), os.fsencode(dest_file), 0) == 0
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        # unlink rather than truncate: dest may be a hard link to source
+        if os.path.lexists(dest_file):
+            os.remove(dest_file)
+        with open(source_file, 'rb') as src, open(dest_file, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        # EXDEV, EOPNOTSUPP, EINVAL, ...
+        return False
+    return True
+
+def _link_file(source_file: str, dest_file: str) -> bool:
+    '''
+    Make dest_file a hard link to source_file, replacing any existing dest_file.
+    Blobs are named by their digest and never modified in place, so both caches can share one inode.
+    Returns False if the filesystem can't link, in which case the caller should copy the bytes instead.
+    '''
+    try:
+        if os.path.lexists(dest_file):
+            os.remove(dest_file)
+        os.link(source_file, dest_file)
+    except OSError:
+        return False
+    return True
+
+def _copy_and_hash(src, dst, hasher, update) -> None:
+    '''
+    Copy src to dst, feeding every chunk into hasher and calling update with its size.
+    Reads into one preallocated COPY_BUFSIZE buffer rather than allocating a bytes object per chunk.
+    '''
+    buf = bytearray(COPY_BUFSIZE)
+    view = memoryview(buf)
+    while n := src.readinto(buf):
+        chunk = view[:n]
+        hasher.update(chunk)
+        dst.write(chunk)
+        update(n)
+
+def copy_with_progress(source_file: str, dest_file: str, desc: str = None, hasher=None, pbar=None, overwrite: bool = True) -> None:
+    '''
+    Copy file contents in COPY_BUFSIZE chunks, showing a tqdm progress bar.
+    shutil.copyfileobj keeps the loop in C; tqdm is advanced from dst.write.
+    Without a hasher, Linux copies with os.sendfile so the bytes stay in the kernel.
+    If a hashlib object is given as hasher, it is updated with the bytes as they are copied.
+    If an existing tqdm bar is given as pbar, it is advanced instead of creating a new one.
+    If overwrite is False, the destination is opened exclusively and FileExistsError is raised if it already exists.
+    '''
+    with open(source_file, 'rb') as src, open(dest_file, 'wb' if overwrite else 'xb') as dst:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(src.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        elif sys.platform == "darwin":
+            # macOS has no posix_fadvise; F_NOCACHE keeps both files out of the unified buffer cache
+            _set_no_cache(src)
+            _set_no_cache(dst)
+        if pbar is not None:
+            progress = nullcontext(pbar)
+        else:
+            from tqdm import tqdm
+            # fstat on the open descriptor rather than a second stat by path
+            progress = tqdm(total=os.fstat(src.fileno()).st_size, unit='B', unit_scale=True, unit_divisor=1024, desc=desc)
+        with progress as bar:
+            if hasher is not None:
+                _copy_and_hash(src, dst, hasher, bar.update)
+            elif not _sendfile(src, dst, bar.update):
+                from tqdm.utils import CallbackIOWrapper
+                shutil.copyfileobj(src, CallbackIOWrapper(bar.update, dst, "write"), COPY_BUFSIZE)
+        if hasattr(os, 'posix_fadvise'):
+            # the copy won't be read again soon, so don't let it evict the page cache
+            dst.flush()
+            os.posix_fadvise(src.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+            os.posix_fadvise(dst.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+def blob_sha256(file_path: str) -> str:
+    '''Return the SHA-256 hex digest of a file.'''
+    with open(file_path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        # Python < 3.11: hash the whole mapped file in one C call
+        sha256_hash = hashlib.sha256()
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                sha256_hash.update(mm)
+        return sha256_hash.hexdigest()
+
+def _sendfile(src, dst, update) -> bool:
+    '''
+    Copy src to dst in COPY_BUFSIZE steps with os.sendfile, calling update with each step's size.
+    Returns False, having copied nothing, if sendfile can't be used for these files.
+    '''
+    if not (sys.platform.startswith("linux") and hasattr(os, "sendfile")):
+        return False
+    offset = 0
+    while True:
+        try:
+            sent = os.sendfile(dst.fileno(), src.fileno(), offset, COPY_BUFSIZE)
+        except OSError:
+            if offset == 0:
+                return False
+            raise
+        if sent == 0:
+            return True
+        offset += sent
+        update(sent)
+
+def _set_no_cache(fileobj) -> None:
+    try:
+        import fcntl
+        fcntl.fcntl(fileobj.fileno(), getattr(fcntl, 'F_NOCACHE', F_NOCACHE), 1)
+    except (ImportError, OSError):
+        pass
+
+def validate_blob_sha256(dest_blob: str, blob_hash_prefix: str, expected_digest: str = ""):
     try:
-        with open(dest_blob, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(chunk)
-        actual_chksum = sha256_hash.hexdigest()
+        actual_chksum = blob_sha256(dest_blob)
         actual_digest = blob_hash_prefix + actual_chksum
         if expected_digest == "":
             print(f"Expected checksum for {dest_blob} not given. For your information, it is: {actual_chksum}")
@@ -1,3 +1,7 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=64)
 def ftStr(word: str, emphasis_index: int = 0) -> str:
     '''
     Helper function to format a string with bold and underline formatting.
@@ -1,6 +1,8 @@
 import unittest
 import os
 import shutil
+import hashlib
+import json
 from unittest.mock import patch
 from src.ollamautil import ollamautil as ollamautil_module # Import the specific module
 
@@ -15,6 +17,30 @@ class TestOllamaUtil(unittest.TestCase):
 
     def tearDown(self):
         shutil.rmtree(self.temp_dir)
+        ollamautil_module._verified_blobs.clear()
+        ollamautil_module._CURNOW_CACHE = None
+        ollamautil_module._walk_cache.clear()
+        ollamautil_module.invalidate_filelist_cache()
+        ollamautil_module._TABLE_CACHE.clear()
+
+    def write_model(self, cache_dir, manifest, config=b'weights', layers=()):
+        '''
+        Write the config and layer blobs into cache_dir/blobs and a manifest naming them at manifest.
+        Returns the blob digests, config first.
+        '''
+        os.makedirs(os.path.join(cache_dir, 'blobs'), exist_ok=True)
+        os.makedirs(os.path.dirname(manifest), exist_ok=True)
+        digests = []
+        for data in (config, *layers):
+            digest = hashlib.sha256(data).hexdigest()
+            with open(os.path.join(cache_dir, 'blobs', 'sha256-' + digest), 'wb') as f:
+                f.write(data)
+            digests.append(digest)
+        with open(manifest, 'w') as f:
+            json.dump({'config': {'digest': 'sha256:' + digests[0]},
+                       'layers': [{'mediaType': 'application/vnd.ollama.image.model', 'digest': 'sha256:' + digest}
+                                  for digest in digests[1:]]}, f)
+        return digests
 
     def test_walk_dir(self): # Removed mock_ignore argument
         # Patch FILE_LIST_IGNORE using patch.object within the test
@@ -28,6 +54,20 @@ class TestOllamaUtil(unittest.TestCase):
             actual_files = ollamautil_module.walk_dir(self.temp_dir)
             self.assertEqual(actual_files, expected_files)
 
+    def test_walk_dir_cache(self):
+        first = ollamautil_module.walk_dir(self.temp_dir)
+        with patch.object(ollamautil_module, 'iter_files') as mock_iter:
+            self.assertEqual(ollamautil_module.walk_dir(self.temp_dir), first)
+            mock_iter.assert_not_called()
+        # a new file changes its directory's mtime
+        new_file = os.path.join(self.temp_dir, 'subdir', 'file3.txt')
+        open(new_file, 'a').close()
+        os.utime(os.path.join(self.temp_dir, 'subdir'), ns=(0, 0))
+        self.assertEqual(ollamautil_module.walk_dir(self.temp_dir), sorted(first + [new_file]))
+
+    def test_walk_dir_missing_directory(self):
+        self.assertEqual(ollamautil_module.walk_dir(os.path.join(self.temp_dir, 'missing')), [])
+
     def test_get_models_table(self):
         # Use path-like names as expected by the function
         combined = [
@@ -40,6 +80,30 @@ class TestOllamaUtil(unittest.TestCase):
         self.assertEqual(len(table.rows), 5)  # 3 rows for model1 and 2 rows for model2
         self.assertEqual(table.field_names, ['No.', 'Lib', 'Model', 'Tag', 'External', 'Internal'])
 
+    def test_display_models_table_cache(self):
+        combined = [[f'library{os.sep}model1', ['tag1'], ['tag2']]]
+        with patch('builtins.print') as mock_print, \
+             patch.object(ollamautil_module, 'get_curnow_cache', return_value='internal'):
+            table = ollamautil_module.display_models_table(combined)
+            with patch.object(ollamautil_module, 'get_models_table') as mock_get:
+                self.assertIs(ollamautil_module.display_models_table([list(m) for m in combined]), table)
+                mock_get.assert_not_called()
+            self.assertEqual(mock_print.call_args_list[0], mock_print.call_args_list[2])
+            self.assertIsNot(ollamautil_module.display_models_table(combined + [[f'user{os.sep}model2', ['tag3'], []]]), table)
+
+    def test_get_models_rows(self):
+        combined = [
+            [f'user{os.sep}model2', ['tag4'], ['tag5']],
+            [f'library{os.sep}model1', ['tag2', 'tag1'], ['tag3', 'tag2']]
+        ]
+        self.assertEqual(ollamautil_module.get_models_rows(combined), [
+            ('library', 'model1', 'tag1', 'Yes', 'No'),
+            ('library', 'model1', 'tag2', 'Yes', 'Yes'),
+            ('library', 'model1', 'tag3', 'No', 'Yes'),
+            ('user', 'model2', 'tag4', 'Yes', 'No'),
+            ('user', 'model2', 'tag5', 'No', 'Yes'),
+        ])
+
     def test_build_ext_int_comb_filelist(self): # Removed mock arguments
         # Use patch.object context managers instead of decorators
         with patch.object(ollamautil_module, 'ollama_ext_dir', 'mock/external/ollama'), \
@@ -60,9 +124,6 @@ class TestOllamaUtil(unittest.TestCase):
 
             external_dict, internal_dict, combined = ollamautil_module.build_ext_int_comb_filelist()
 
-            print(f"external_dict: {external_dict}") # Debug log
-            print(f"internal_dict: {internal_dict}") # Debug log
-            print(f"combined: {combined}") # Debug log
             # Assertions based on the mocked walk_dir output
             expected_external = {
                 'library/modelA': ['tag1', 'tag2'],
@@ -93,6 +154,23 @@ class TestOllamaUtil(unittest.TestCase):
             self.assertEqual(internal_dict, expected_internal)
             self.assertEqual(combined, expected_combined)
 
+    def test_build_ext_int_comb_filelist_new_tag(self):
+        ext_dir = os.path.join(self.temp_dir, 'external')
+        int_dir = os.path.join(self.temp_dir, 'internal')
+        model_dir = os.path.join(ext_dir, 'manifests', 'registry.ollama.ai', 'library', 'llama3')
+        os.makedirs(model_dir)
+        os.makedirs(os.path.join(int_dir, 'manifests'))
+        open(os.path.join(model_dir, 'latest'), 'w').close()
+        with patch.object(ollamautil_module, 'ollama_ext_dir', ext_dir), \
+             patch.object(ollamautil_module, 'ollama_int_dir', int_dir):
+            external_dict, _, _ = ollamautil_module.build_ext_int_comb_filelist()
+            self.assertEqual(external_dict[os.path.join('registry.ollama.ai', 'library', 'llama3')], ['latest'])
+            # a tag whose blobs already exist only changes its model's directory
+            open(os.path.join(model_dir, '8b'), 'w').close()
+            os.utime(model_dir, ns=(0, 0))
+            external_dict, _, _ = ollamautil_module.build_ext_int_comb_filelist()
+            self.assertEqual(sorted(external_dict[os.path.join('registry.ollama.ai', 'library', 'llama3')]), ['8b', 'latest'])
+
     @patch('builtins.input', return_value='yes')
     def test_get_user_confirmation_yes(self, input):
         self.assertTrue(ollamautil_module.get_user_confirmation("Test prompt"))
@@ -109,25 +187,98 @@ class TestOllamaUtil(unittest.TestCase):
     def test_get_user_confirmation_n(self, input):
         self.assertFalse(ollamautil_module.get_user_confirmation("Test prompt"))
 
+    @patch('builtins.input', return_value=' Yes ')
+    def test_get_user_confirmation_strips_input(self, input):
+        self.assertTrue(ollamautil_module.get_user_confirmation("Test prompt"))
+
     @patch('builtins.input', side_effect=['maybe', 'yes'])
     def test_get_user_confirmation_invalid_then_yes(self, input):
         self.assertTrue(ollamautil_module.get_user_confirmation("Test prompt"))
 
     def test_get_curnow_cache(self):
-        # Example test case for get_curnow_cache
-        pass
+        home = os.path.abspath(self.temp_dir)
+        os.makedirs(os.path.join(home, '.ollama'))
+        int_dir = os.path.join(home, 'internal')
+        os.symlink(int_dir, os.path.join(home, '.ollama', 'models'))
+        with patch.object(ollamautil_module, 'ollama_int_dir', int_dir), \
+             patch.dict(os.environ, {'HOME': home}):
+            self.assertEqual(ollamautil_module.get_curnow_cache(), 'internal')
+            with patch.object(ollamautil_module.os, 'readlink') as mock_readlink:
+                self.assertEqual(ollamautil_module.get_curnow_cache(), 'internal')
+                mock_readlink.assert_not_called()
+
+    def test_get_curnow_cache_unknown_target(self):
+        home = os.path.abspath(self.temp_dir)
+        os.makedirs(os.path.join(home, '.ollama'))
+        os.symlink(os.path.join(home, 'elsewhere'), os.path.join(home, '.ollama', 'models'))
+        with patch.dict(os.environ, {'HOME': home}), patch('builtins.print') as mock_print:
+            self.assertIsNone(ollamautil_module.get_curnow_cache())
+            mock_print.assert_called_once()
+        self.assertIsNone(ollamautil_module._CURNOW_CACHE)
 
     def test_toggle_int_ext_cache(self):
         # Example test case for toggle_int_ext_cache
         pass
 
+    def test_toggle_int_ext_cache_unknown_target(self):
+        with patch.object(ollamautil_module, 'get_curnow_cache', return_value=None), \
+             patch.object(ollamautil_module, 'display_models_table'), \
+             patch.object(ollamautil_module, '_toggle_cache') as mock_toggle, \
+             patch('builtins.input', return_value='2'):
+            ollamautil_module.toggle_int_ext_cache([])
+        mock_toggle.assert_called_once_with('external')
+
+    def test_toggle_cache(self):
+        home = os.path.abspath(self.temp_dir)
+        os.makedirs(os.path.join(home, '.ollama'))
+        int_dir = os.path.join(home, 'internal')
+        ext_dir = os.path.join(home, 'external')
+        with patch.object(ollamautil_module, 'ollama_int_dir', int_dir), \
+             patch.object(ollamautil_module, 'ollama_ext_dir', ext_dir), \
+             patch.dict(os.environ, {'HOME': home}):
+            link_path = os.path.join(home, '.ollama', 'models')
+            self.assertEqual(ollamautil_module._toggle_cache('internal'), 'external')
+            self.assertEqual(os.readlink(link_path), int_dir)
+            self.assertEqual(ollamautil_module._toggle_cache('external'), 'internal')
+            self.assertEqual(os.readlink(link_path), ext_dir)
+            self.assertFalse(os.path.lexists(link_path + '.tmp'))
+            self.assertEqual(ollamautil_module.get_curnow_cache(), 'external')
+
+    def test_toggle_cache_models_directory(self):
+        home = os.path.abspath(self.temp_dir)
+        link_path = os.path.join(home, '.ollama', 'models')
+        os.makedirs(os.path.join(link_path, 'blobs'))
+        with patch.object(ollamautil_module, 'ollama_int_dir', os.path.join(home, 'internal')), \
+             patch.dict(os.environ, {'HOME': home}), patch('builtins.print'):
+            self.assertIsNone(ollamautil_module._toggle_cache('internal'))
+        self.assertTrue(os.path.isdir(os.path.join(link_path, 'blobs')))
+        self.assertFalse(os.path.lexists(link_path + '.tmp'))
+        self.assertIsNone(ollamautil_module._CURNOW_CACHE)
+
     def test_select_models(self):
-        # Example test case for select_models
-        pass
+        combined = [
+            [f'library{os.sep}model1', ['tag1', 'tag2'], ['tag2', 'tag3']],
+            [f'user{os.sep}model2', ['tag4'], ['tag5']]
+        ]
+        table = ollamautil_module.get_models_table(combined)
+        with patch('builtins.input', return_value='1, 4-5'), patch('builtins.print'):
+            selected = ollamautil_module.select_models(table)
+        self.assertEqual(selected, [['library', 'model1', 'tag1'], ['user', 'model2', 'tag4'], ['user', 'model2', 'tag5']])
+        rows = ollamautil_module.get_models_rows(combined)
+        with patch('builtins.input', return_value='2'), patch('builtins.print'):
+            self.assertEqual(ollamautil_module.select_models(table, rows=rows), [['library', 'model1', 'tag2']])
+        with patch('builtins.input', side_effect=['0', '6', '5']), patch('builtins.print'):
+            self.assertEqual(ollamautil_module.select_models(table, rows=rows), [['user', 'model2', 'tag5']])
+        with patch('builtins.input') as mock_input, patch('builtins.print'):
+            self.assertEqual(len(ollamautil_module.select_models(table, bypassGetAll=True)), 5)
+            mock_input.assert_not_called()
 
     def test_pull_models(self):
-        # Example test case for pull_models
-        pass
+        selected = [('library', 'model1', 'tag1'), ('user', 'model2', 'tag2')]
+        with patch.object(ollamautil_module, 'select_models', return_value=selected), \
+             patch('ollama.pull') as mock_pull:
+            ollamautil_module.pull_models([], table=object())
+        self.assertCountEqual([c.args[0] for c in mock_pull.call_args_list], ['model1:tag1', 'user/model2:tag2'])
 
     def test_push_models(self):
         # Example test case for push_models
@@ -138,16 +289,143 @@ class TestOllamaUtil(unittest.TestCase):
         pass
 
     def test_migrate_cache(self):
-        # Example test case for migrate_cache
-        pass
+        ext_dir = os.path.join(self.temp_dir, 'external')
+        int_dir = os.path.join(self.temp_dir, 'internal')
+        manifest_dir = os.path.join(ext_dir, 'manifests', 'registry.ollama.ai', 'library', 'model1')
+        for tag in ('tag1', 'tag2'):
+            digest, = self.write_model(ext_dir, os.path.join(manifest_dir, tag))
+        with patch.object(ollamautil_module, 'ollama_ext_dir', ext_dir), \
+             patch.object(ollamautil_module, 'ollama_int_dir', int_dir):
+            ollamautil_module.migrate_cache(selected_files=[['library', 'model1', 'tag1']], which_direction='1')
+        self.assertTrue(os.path.isfile(os.path.join(int_dir, 'manifests', 'registry.ollama.ai', 'library', 'model1', 'tag1')))
+        self.assertFalse(os.path.exists(os.path.join(int_dir, 'manifests', 'registry.ollama.ai', 'library', 'model1', 'tag2')))
+        self.assertTrue(os.path.isfile(os.path.join(int_dir, 'blobs', 'sha256-' + digest)))
+
+    def test_migrate_cache_not_enough_space(self):
+        from types import SimpleNamespace
+        ext_dir = os.path.join(self.temp_dir, 'external')
+        int_dir = os.path.join(self.temp_dir, 'internal')
+        os.makedirs(int_dir)
+        digest, = self.write_model(ext_dir, os.path.join(ext_dir, 'manifests', 'registry.ollama.ai', 'library', 'model1', 'tag1'))
+        with patch.object(ollamautil_module, 'ollama_ext_dir', ext_dir), \
+             patch.object(ollamautil_module, 'ollama_int_dir', int_dir), \
+             patch.object(ollamautil_module.shutil, 'disk_usage', return_value=SimpleNamespace(free=8)), \
+             patch('builtins.print') as mock_print:
+            with patch.object(ollamautil_module, '_same_device', return_value=False):
+                ollamautil_module.migrate_cache(selected_files=[['library', 'model1', 'tag1']], which_direction='1')
+            self.assertIn('Not enough space', mock_print.call_args[0][0])
+            self.assertEqual(os.listdir(int_dir), [])
+            # on one device without hard links (e.g. exFAT) every blob is byte-copied
+            with patch.object(ollamautil_module.os, 'link', side_effect=OSError):
+                ollamautil_module.migrate_cache(selected_files=[['library', 'model1', 'tag1']], which_direction='1')
+            self.assertIn('Not enough space', mock_print.call_args[0][0])
+            self.assertEqual(os.listdir(os.path.join(int_dir, 'blobs')), [])
+            # on one device the blobs are linked, so they need no space
+            ollamautil_module.migrate_cache(selected_files=[['library', 'model1', 'tag1']], which_direction='1')
+        self.assertTrue(os.path.isfile(os.path.join(int_dir, 'blobs', 'sha256-' + digest)))
+
+    def test_migrate_cache_overwrite_space(self):
+        from types import SimpleNamespace
+        ext_dir = os.path.join(self.temp_dir, 'external')
+        int_dir = os.path.join(self.temp_dir, 'internal')
+        manifest = os.path.join('manifests', 'registry.ollama.ai', 'library', 'model1', 'tag1')
+        digest, = self.write_model(ext_dir, os.path.join(ext_dir, manifest), config=b'weights' * 1000)
+        self.write_model(int_dir, os.path.join(int_dir, manifest), config=b'weights' * 1000)
+        with patch.object(ollamautil_module, 'ollama_ext_dir', ext_dir), \
+             patch.object(ollamautil_module, 'ollama_int_dir', int_dir), \
+             patch.object(ollamautil_module, '_same_device', return_value=False), \
+             patch.object(ollamautil_module.shutil, 'disk_usage', return_value=SimpleNamespace(free=1000)), \
+             patch.object(ollamautil_module, 'copy_blobs') as mock_copy_blobs:
+            # the blob is rewritten in place, so only the manifest needs new space
+            ollamautil_module.migrate_cache(selected_files=[['library', 'model1', 'tag1']], which_direction='1', overwrite=True)
+        self.assertIn(digest, mock_copy_blobs.call_args[0][0])
 
     def test_copy_blob_files(self):
-        # Example test case for copy_blob_files
-        pass
+        source_dir = os.path.join(self.temp_dir, 'source')
+        dest_dir = os.path.join(self.temp_dir, 'dest')
+        manifest = os.path.join(source_dir, 'manifest')
+        digests = self.write_model(source_dir, manifest, config=b'{}', layers=[b'weights' * 1000])
+        # source and dest share a device here; force the copy-and-hash path
+        with patch.object(ollamautil_module, '_same_device', return_value=False), \
+             patch.object(ollamautil_module, 'validate_blob_sha256') as mock_validate:
+            ollamautil_module.copy_blob_files(manifest, None, source_dir, dest_dir, overwrite=False)
+            mock_validate.assert_not_called()
+        for digest in digests:
+            with open(os.path.join(dest_dir, 'blobs', 'sha256-' + digest), 'rb') as f:
+                self.assertEqual(hashlib.sha256(f.read()).hexdigest(), digest)
+        # Verified blobs are not copied again, even with overwrite
+        with patch.object(ollamautil_module, 'copy_with_progress') as mock_copy:
+            ollamautil_module.copy_blob_files(manifest, None, source_dir, dest_dir, overwrite=True)
+            mock_copy.assert_not_called()
+
+    def test_blob_copy_jobs_existing_blobs(self):
+        source_dir = os.path.join(self.temp_dir, 'source')
+        dest_dir = os.path.join(self.temp_dir, 'dest')
+        os.makedirs(os.path.join(dest_dir, 'blobs'))
+        manifest = os.path.join(source_dir, 'manifest')
+        digest, = self.write_model(source_dir, manifest)
+        dest_blob = os.path.join(dest_dir, 'blobs', 'sha256-' + digest)
+        with patch('builtins.print'):
+            # truncated copy: recopied on size alone
+            with open(dest_blob, 'wb') as f:
+                f.write(b'weig')
+            self.assertIn(digest, ollamautil_module.blob_copy_jobs(manifest, source_dir, dest_dir, overwrite=False))
+            # same size, wrong bytes: only caught with verify
+            with open(dest_blob, 'wb') as f:
+                f.write(b'WEIGHTS')
+            self.assertEqual(ollamautil_module.blob_copy_jobs(manifest, source_dir, dest_dir, overwrite=False), {})
+            self.assertIn(digest, ollamautil_module.blob_copy_jobs(manifest, source_dir, dest_dir, overwrite=False, verify=True))
+
+    def test_copy_blobs_clone(self):
+        source_blob = os.path.join(self.temp_dir, 'source', 'sha256-abc')
+        dest_blob = os.path.join(self.temp_dir, 'dest', 'sha256-abc')
+        os.makedirs(os.path.dirname(source_blob))
+        with open(source_blob, 'wb') as f:
+            f.write(b'not abc')
+        with patch.object(ollamautil_module, '_clone_file', return_value=True) as mock_clone, \
+             patch.object(ollamautil_module, 'validate_blob_sha256') as mock_validate:
+            ollamautil_module.copy_blobs({'abc': (source_blob, dest_blob)})
+            mock_clone.assert_called_once_with(source_blob, dest_blob)
+            mock_validate.assert_not_called()
+
+    def test_copy_blobs_link(self):
+        source_blob = os.path.join(self.temp_dir, 'source', 'sha256-abc')
+        dest_blob = os.path.join(self.temp_dir, 'dest', 'sha256-abc')
+        os.makedirs(os.path.dirname(source_blob))
+        with open(source_blob, 'wb') as f:
+            f.write(b'not abc')
+        with patch.object(ollamautil_module, '_clone_file', return_value=False), \
+             patch.object(ollamautil_module, 'validate_blob_sha256') as mock_validate:
+            ollamautil_module.copy_blobs({'abc': (source_blob, dest_blob)})
+            mock_validate.assert_not_called()
+        self.assertTrue(os.path.samefile(source_blob, dest_blob))
+
+    def test_copy_blob_files_relinked_with_overwrite(self):
+        source_dir = os.path.join(self.temp_dir, 'source')
+        dest_dir = os.path.join(self.temp_dir, 'dest')
+        manifest = os.path.join(source_dir, 'manifest')
+        digest, = self.write_model(source_dir, manifest)
+        source_blob = os.path.join(source_dir, 'blobs', 'sha256-' + digest)
+        dest_blob = os.path.join(dest_dir, 'blobs', 'sha256-' + digest)
+        with patch.object(ollamautil_module, '_clone_file', return_value=False):
+            ollamautil_module.copy_blob_files(manifest, None, source_dir, dest_dir, overwrite=False)
+        self.assertTrue(os.path.samefile(source_blob, dest_blob))
+        ollamautil_module._verified_blobs.clear()
+        ollamautil_module.copy_blob_files(manifest, None, source_dir, dest_dir, overwrite=True)
+        for blob in (source_blob, dest_blob):
+            with open(blob, 'rb') as f:
+                self.assertEqual(f.read(), b'weights')
 
     def test_validate_blob_sha256(self):
-        # Example test case for validate_blob_sha256
-        pass
+        blob = os.path.join(self.temp_dir, 'blob')
+        with open(blob, 'wb') as f:
+            f.write(b'blob data')
+        digest = 'sha256-' + hashlib.sha256(b'blob data').hexdigest()
+        with patch.object(ollamautil_module, 'handle_corrupted_file') as mock_handle:
+            ollamautil_module.validate_blob_sha256(blob, 'sha256-', digest)
+            mock_handle.assert_not_called()
+            ollamautil_module.validate_blob_sha256(blob, 'sha256-', 'sha256-' + '0' * 64)
+            mock_handle.assert_called_once_with(blob)
 
     def test_copy_metadata(self):
         # Example test case for copy_metadata
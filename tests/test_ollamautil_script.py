@@ -0,0 +1,108 @@
+import unittest
+import os
+import shutil
+import importlib.util
+from unittest.mock import patch
+
+# the standalone script at the repository root, loaded by path since it isn't part of the package
+_spec = importlib.util.spec_from_file_location(
+    "ollamautil_script", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ollamautil.py"))
+ollamautil_script = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(ollamautil_script)
+
+class TestOllamaUtilScript(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = os.path.abspath('temp_script_test_dir')
+        os.makedirs(self.temp_dir, exist_ok=True)
+        self.source_file = os.path.join(self.temp_dir, 'source')
+        self.target_file = os.path.join(self.temp_dir, 'target')
+        # several HASH_BUFFER_SIZE chunks and a partial one
+        self.data = os.urandom(3 * ollamautil_script.HASH_BUFFER_SIZE + 123)
+        with open(self.source_file, 'wb') as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        ollamautil_script._CURNOW_CACHE = None
+        ollamautil_script._invalidate_caches()
+
+    def test_copy_file_range_error_truncates(self):
+        with open(self.source_file, 'rb') as src, open(self.target_file, 'wb') as dst:
+            dst.write(b'partial')
+            dst.flush()
+            with patch.object(ollamautil_script.os, 'copy_file_range', side_effect=OSError(18, 'EXDEV'), create=True):
+                self.assertFalse(ollamautil_script._copy_file_range(src, dst))
+            self.assertEqual(src.tell(), 0)
+        self.assertEqual(os.path.getsize(self.target_file), 0)
+
+    def test_copy_file_range_short_copy_falls_back(self):
+        with open(self.source_file, 'rb') as src, open(self.target_file, 'wb') as dst:
+            with patch.object(ollamautil_script.os, 'copy_file_range', return_value=0, create=True):
+                self.assertFalse(ollamautil_script._copy_file_range(src, dst))
+        self.assertEqual(os.path.getsize(self.target_file), 0)
+
+    def test_fast_copy_userspace_hashes_source(self):
+        with patch.object(ollamautil_script.sys, 'platform', 'linux'), \
+             patch.object(ollamautil_script, '_copy_file_range', return_value=False):
+            method, source_hash = ollamautil_script._fast_copy(self.source_file, self.target_file)
+        self.assertEqual(method, ollamautil_script.CopyMethod.USERSPACE_COPY)
+        self.assertEqual(source_hash, ollamautil_script.file_hash(self.source_file))
+        with open(self.target_file, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_fast_copy_short_kernel_copy_is_redone(self):
+        with patch.object(ollamautil_script.sys, 'platform', 'linux'), \
+             patch.object(ollamautil_script.os, 'copy_file_range', return_value=0, create=True):
+            method, source_hash = ollamautil_script._fast_copy(self.source_file, self.target_file)
+        self.assertEqual(method, ollamautil_script.CopyMethod.USERSPACE_COPY)
+        self.assertEqual(source_hash, ollamautil_script.file_hash(self.target_file))
+
+    def test_fast_copy_hard_linked_target(self):
+        os.link(self.source_file, self.target_file)
+        with patch.object(ollamautil_script.sys, 'platform', 'linux'):
+            ollamautil_script._fast_copy(self.source_file, self.target_file)
+        for path in (self.source_file, self.target_file):
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), self.data)
+
+    def test_fast_copy_same_file(self):
+        os.symlink(self.source_file, self.target_file)
+        with self.assertRaises(shutil.SameFileError):
+            ollamautil_script._fast_copy(self.source_file, self.target_file)
+        with open(self.source_file, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_toggle_cache(self):
+        int_dir = os.path.join(self.temp_dir, 'internal')
+        ext_dir = os.path.join(self.temp_dir, 'external')
+        os.makedirs(int_dir)
+        os.makedirs(ext_dir)
+        link_path = os.path.join(self.temp_dir, 'models')
+        os.symlink(ext_dir, link_path)
+        with patch.object(ollamautil_script, 'OLLAMA_MODELS_LINK', link_path), \
+             patch.object(ollamautil_script, 'ollama_int_dir', int_dir, create=True), \
+             patch.object(ollamautil_script, 'ollama_ext_dir', ext_dir, create=True), \
+             patch('builtins.print'):
+            self.assertEqual(ollamautil_script._toggle_cache(('internal', int_dir)), 'external')
+        self.assertEqual(os.readlink(link_path), int_dir)
+        self.assertFalse(os.path.lexists(link_path + '.tmp'))
+        self.assertEqual(ollamautil_script._CURNOW_CACHE, ('internal', int_dir))
+
+    def test_toggle_cache_models_directory(self):
+        int_dir = os.path.join(self.temp_dir, 'internal')
+        os.makedirs(int_dir)
+        link_path = os.path.join(self.temp_dir, 'models')
+        os.makedirs(os.path.join(link_path, 'blobs'))
+        with patch.object(ollamautil_script, 'OLLAMA_MODELS_LINK', link_path), \
+             patch.object(ollamautil_script, 'ollama_int_dir', int_dir, create=True), \
+             patch.object(ollamautil_script, 'ollama_ext_dir', os.path.join(self.temp_dir, 'external'), create=True):
+            with self.assertWarns(UserWarning):
+                self.assertIsNone(ollamautil_script._toggle_cache(('internal', int_dir)))
+        self.assertTrue(os.path.isdir(os.path.join(link_path, 'blobs')))
+        self.assertFalse(os.path.lexists(link_path + '.tmp'))
+        self.assertIsNone(ollamautil_script._CURNOW_CACHE)
+
+
+if __name__ == '__main__':
+    unittest.main()